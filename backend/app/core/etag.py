@@ -0,0 +1,23 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag from the parts that fully determine a representation."""
+    digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate `If-None-Match` against `etag` using the weak comparison RFC 9110 requires for it."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,143 @@
+import asyncio
+import base64
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+
+import httpx
+from authlib.jose import JsonWebKey, KeySet
+
+from app.core.metrics import timer
+from app.models.settings import get_settings
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def get_unverified_kid(token: str) -> str | None:
+    """Read the `kid` from the JWT header without verifying anything."""
+    header = token.split(".", 1)[0]
+    try:
+        return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))).get("kid")
+    except Exception:
+        return None
+
+
+class JwksCache:
+    """In-process JWKS cache with TTL, refresh-ahead, kid-miss refetch and single-flight fetches."""
+
+    def __init__(
+        self,
+        jwks_url: str,
+        default_ttl: int = 600,
+        min_ttl: int = 30,
+        refresh_ahead: int = 60,
+        min_refetch_interval: int = 30,
+        timeout: float = 5.0,
+    ):
+        self.jwks_url = jwks_url
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.refresh_ahead = refresh_ahead
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.key_set: KeySet | None = None
+        self.kids: set[str] = set()
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self.fetched_at = 0.0
+        self.fetch_count = 0
+        self._fetch_task: asyncio.Task | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    async def get_key_set(self, kid: str | None = None) -> KeySet:
+        now = time.monotonic()
+        if self.key_set is None or now >= self.expires_at:
+            await self._refresh()
+        elif now >= self.refresh_at:
+            self._start_fetch()
+
+        if kid and kid not in self.kids and time.monotonic() - self.fetched_at >= self.min_refetch_interval:
+            logging.info(f"Unknown JWKS kid {kid}, refetching key set.")
+            await self._refresh()
+
+        if self.key_set is None:
+            raise RuntimeError("JWKS is not available.")
+        return self.key_set
+
+    async def aclose(self):
+        if self._fetch_task is not None:
+            self._fetch_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _refresh(self):
+        task = self._start_fetch()
+        try:
+            await asyncio.shield(task)
+        except Exception as e:
+            if self.key_set is None:
+                raise
+            # Keep serving the stale key set rather than failing every request while the IdP is down.
+            logging.warning(f"JWKS refresh failed, using cached keys: {e}")
+
+    def _start_fetch(self) -> asyncio.Task:
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch())
+            self._fetch_task.add_done_callback(self._on_fetch_done)
+        return self._fetch_task
+
+    @staticmethod
+    def _on_fetch_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Error fetching JWKS: {task.exception()}")
+
+    async def _fetch(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+
+        try:
+            with timer("jwks_fetch"):
+                response = await self._client.get(self.jwks_url)
+                response.raise_for_status()
+                jwks = response.json()
+                self.key_set = JsonWebKey.import_key_set(jwks)
+            self.kids = {key.get("kid") for key in jwks.get("keys", []) if key.get("kid")}
+            ttl = self._get_ttl(response.headers.get("cache-control"))
+            self.expires_at = time.monotonic() + ttl
+            self.refresh_at = self.expires_at - min(self.refresh_ahead, ttl // 2)
+            self.fetch_count += 1
+        except Exception:
+            if self.key_set is not None:
+                # Serve the stale keys without waiting on the IdP again, in the foreground or ahead, until then
+                retry_at = time.monotonic() + self.min_refetch_interval
+                self.expires_at = max(self.expires_at, retry_at)
+                self.refresh_at = retry_at
+            raise
+        finally:
+            self.fetched_at = time.monotonic()
+
+    def _get_ttl(self, cache_control: str | None) -> int:
+        if not cache_control:
+            return self.default_ttl
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return self.min_ttl
+
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if not match:
+            return self.default_ttl
+        return max(int(match.group(1)), self.min_ttl)
+
+
+@lru_cache()
+def get_jwks_cache() -> JwksCache:
+    config = get_settings()
+    return JwksCache(
+        config.auth0_jwks_url or f"https://{config.auth0_domain}/.well-known/jwks.json",
+        default_ttl=config.jwks_cache_ttl,
+        refresh_ahead=config.jwks_refresh_ahead,
+        min_refetch_interval=config.jwks_min_refetch_interval,
+        timeout=config.jwks_timeout,
+    )
@@ -3,16 +3,32 @@ import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.core.token_cache import get_token_cache
 from app.models.auth import ApiUser
+from app.models.settings import Settings, get_settings
 from app.services.auth import AuthorizationService
 
 bearer_scheme = HTTPBearer()
 
 
-async def get_current_user(token: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> ApiUser:
+async def authenticate(token: str, config: Settings | None = None) -> ApiUser | None:
+    """Return the user for a bearer token, verifying the signature only on a cache miss."""
+    cache = get_token_cache()
+    user = cache.get(token)
+    if user is None:
+        service = AuthorizationService(config)
+        user = await service.get_claims(token)
+        if user:
+            cache.set(token, user)
+    return user
+
+
+async def get_current_user(
+    token: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    config: Settings = Depends(get_settings),
+) -> ApiUser:
     try:
-        service = AuthorizationService()
-        user = await service.get_claims(token.credentials)
+        user = await authenticate(token.credentials, config)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -21,6 +37,8 @@ async def get_current_user(token: HTTPAuthorizationCredentials = Depends(bearer_
             )
         logging.info(f"Authenticated user: {user.id} with permissions: {user.permissions}")
         return user
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in get_current_user: {e}", exc_info=True)
         raise HTTPException(
@@ -31,17 +49,21 @@ async def get_current_user(token: HTTPAuthorizationCredentials = Depends(bearer_
 
 
 def require_permissions(permissions: set[str]):
-    async def permission_dependency(token: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> ApiUser:
+    required_permissions = frozenset(permissions)
+
+    async def permission_dependency(
+        token: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+        config: Settings = Depends(get_settings),
+    ) -> ApiUser:
         try:
-            service = AuthorizationService()
-            user = await service.get_claims(token.credentials)
+            user = await authenticate(token.credentials, config)
             if not user:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid token",
                     headers={"WWW-Authenticate": "Bearer"},
                 )
-            if not user.permissions.issuperset(permissions):
+            if not required_permissions <= user.permissions:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Insufficient permissions",
@@ -49,6 +71,8 @@ def require_permissions(permissions: set[str]):
                 )
             logging.info(f"User {user.id} has required permissions: {permissions}")
             return user
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error in require_permissions: {e}", exc_info=True)
             raise HTTPException(
@@ -0,0 +1,28 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.core.jwks import get_jwks_cache
+from app.models.settings import get_settings, install_reload_handler
+from app.services.catalog import get_catalog_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Resources of one worker process, built before uvicorn accepts connections and closed on shutdown."""
+    config = get_settings()
+    install_reload_handler()
+    get_catalog_store()
+    jwks = get_jwks_cache()
+    # An IdP outage at startup should not keep the worker from starting; the first request retries the fetch
+    try:
+        await asyncio.wait_for(jwks.get_key_set(), config.jwks_timeout)
+        logging.info("JWKS ready.")
+    except Exception as e:
+        logging.warning(f"JWKS could not be loaded at startup: {str(e) or type(e).__name__}")
+    try:
+        yield
+    finally:
+        await jwks.aclose()
@@ -0,0 +1,134 @@
+import logging
+import time
+from contextlib import nullcontext
+
+from fastapi import FastAPI, Request, Response
+
+from app.models.settings import get_settings
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # Optional: install the `metrics` extra to enable metrics
+    prometheus_client = None
+
+_NOOP = nullcontext()
+
+registry = None
+request_seconds = None
+requests_in_flight = None
+stage_seconds = None
+
+
+def timer(stage: str):
+    """Time a hot-path stage. When metrics are disabled this is a shared no-op context manager."""
+    if stage_seconds is None:
+        return _NOOP
+    return stage_seconds.labels(stage).time()
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram and in-flight gauge. Routes are labelled by their path template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = route_label(scope)
+            request_seconds.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def route_label(scope) -> str:
+    """Path template of the matched route, including router prefixes, so labels stay low-cardinality."""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = route.path_format
+    try:
+        rendered = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    # Routers may be mounted, in which case the route only knows the part of the path below its prefix
+    return path[: len(path) - len(rendered)] + template if path.endswith(rendered) else template
+
+
+class StateCollector:
+    """Reads the counters the token and JWKS caches already keep, so they cost nothing until scraped."""
+
+    def collect(self):
+        from app.core.jwks import get_jwks_cache
+        from app.core.token_cache import get_token_cache
+
+        token_cache = get_token_cache()
+        cache_requests = CounterMetricFamily(
+            "backend_token_cache_requests", "Verified token cache lookups", labels=["result"]
+        )
+        cache_requests.add_metric(["hit"], token_cache.hits)
+        cache_requests.add_metric(["miss"], token_cache.misses)
+        yield cache_requests
+        evictions = CounterMetricFamily("backend_token_cache_evictions", "Verified token cache evictions")
+        evictions.add_metric([], token_cache.evictions)
+        yield evictions
+        size = GaugeMetricFamily("backend_token_cache_size", "Verified tokens currently cached")
+        size.add_metric([], len(token_cache.entries))
+        yield size
+
+        jwks_fetches = CounterMetricFamily("backend_jwks_fetches", "Successful JWKS fetches")
+        jwks_fetches.add_metric([], get_jwks_cache().fetch_count)
+        yield jwks_fetches
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(prometheus_client.generate_latest(registry), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app: FastAPI):
+    """Add the metrics middleware and `/metrics` when `metrics_enabled` is set."""
+    global registry, request_seconds, requests_in_flight, stage_seconds
+    if not get_settings().metrics_enabled:
+        return
+    if prometheus_client is None:
+        logging.warning("metrics_enabled is set but the metrics extra is not installed, metrics are disabled.")
+        return
+
+    if registry is None:
+        registry = prometheus_client.CollectorRegistry()
+        request_seconds = prometheus_client.Histogram(
+            "backend_request_duration_seconds",
+            "Request latency by route",
+            ["method", "route", "status"],
+            registry=registry,
+        )
+        requests_in_flight = prometheus_client.Gauge(
+            "backend_requests_in_flight", "Requests being handled", registry=registry
+        )
+        stage_seconds = prometheus_client.Histogram(
+            "backend_stage_duration_seconds",
+            "Time spent in hot-path stages",
+            ["stage"],
+            buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+            registry=registry,
+        )
+        registry.register(StateCollector())
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
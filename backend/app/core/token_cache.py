@@ -0,0 +1,58 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.models.auth import ApiUser
+from app.models.settings import get_settings
+
+
+class TokenCache:
+    """Bounded LRU of verified users keyed by a hash of the bearer token. Entries live until the token's `exp`."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, ApiUser] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> ApiUser | None:
+        key = self._key(token)
+        user = self.entries.get(key)
+        if user is None:
+            self.misses += 1
+            return None
+
+        if user.expires_at is not None and user.expires_at <= time.time():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, token: str, user: ApiUser):
+        if user.expires_at is None or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        self.entries[key] = user
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+
+@lru_cache()
+def get_token_cache() -> TokenCache:
+    config = get_settings()
+    return TokenCache(max_size=config.token_cache_size)
@@ -2,9 +2,13 @@ import logging
 
 from fastapi import FastAPI
 
+from app.core.lifespan import lifespan
+from app.core.metrics import setup_metrics
 from app.routes import catalog, users
 
 logging.basicConfig(level=logging.INFO)
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(catalog.router, prefix="/catalog", tags=["catalog"])
 app.include_router(users.router, prefix="/users", tags=["users"])
+setup_metrics(app)
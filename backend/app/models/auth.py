@@ -4,3 +4,4 @@ from pydantic import BaseModel, Field
 class ApiUser(BaseModel):
     id: str
     permissions: set[str] = Field(default_factory=set)
+    expires_at: int | None = None
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -7,3 +9,19 @@ class Product(BaseModel):
     description: str = Field(..., description="Description of the product")
     price: float = Field(..., description="Price of the product")
     stock: int = Field(..., description="Available stock for the product")
+
+
+class CatalogQuery(BaseModel):
+    cursor: str | None = Field(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+    limit: int = Field(50, ge=1, le=200, description="Maximum number of products to return")
+    sort_by: Literal["id", "price", "stock"] = Field("id", description="Field to sort by")
+    order: Literal["asc", "desc"] = Field("asc", description="Sort direction")
+    min_price: float | None = Field(None, ge=0, description="Only products with at least this price")
+    max_price: float | None = Field(None, ge=0, description="Only products with at most this price")
+    min_stock: int | None = Field(None, ge=0, description="Only products with at least this stock")
+    max_stock: int | None = Field(None, ge=0, description="Only products with at most this stock")
+
+
+class ProductPage(BaseModel):
+    items: list[Product] = Field(..., description="Products on this page")
+    next_cursor: str | None = Field(None, description="Cursor for the next page, empty on the last page")
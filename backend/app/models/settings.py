@@ -1,7 +1,46 @@
+import asyncio
+import logging
+import signal
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
     auth0_domain: str
     auth0_audience: str
+    auth0_jwks_url: str | None = None
+    jwks_cache_ttl: int = 600
+    jwks_refresh_ahead: int = 60
+    jwks_min_refetch_interval: int = 30
+    jwks_timeout: float = 5.0
+    token_cache_size: int = 10000
+    catalog_size: int = 10
+    catalog_seed: int = 42
+    catalog_file: str | None = None
+    metrics_enabled: bool = False
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    """Settings are parsed once per process. Use as a FastAPI dependency so tests can override them."""
+    return Settings()
+
+
+def reload_settings() -> Settings:
+    """Re-read the environment and `.env`. Values captured at startup (pools, keys) keep their old values."""
+    get_settings.cache_clear()
+    config = get_settings()
+    logging.info("Settings reloaded.")
+    return config
+
+
+def install_reload_handler() -> None:
+    """Reload settings on SIGHUP. Needs the main thread of a platform that has the signal."""
+    if not hasattr(signal, "SIGHUP"):
+        return
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+    except (RuntimeError, NotImplementedError) as e:
+        logging.info(f"Settings reload on SIGHUP is not available: {str(e)}")
@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+
+from app.core.etag import etag_matches, not_modified
 from app.core.jwt_bearer import require_permissions
 from app.models.auth import ApiUser
-from app.models.catalog import Product
-from app.services.catalog import CatalogService
+from app.models.catalog import CatalogQuery, ProductPage
+from app.services.catalog import CatalogService, InvalidCursorError
 
 router = APIRouter()
 
 
 @router.get("/")
-def get_products(user: ApiUser = Depends(require_permissions({"read:products"}))) -> list[Product]:
+def get_products(
+    query: Annotated[CatalogQuery, Query()],
+    request: Request,
+    response: Response,
+    user: ApiUser = Depends(require_permissions({"read:products"})),
+) -> ProductPage:
     service = CatalogService()
-    return service.get_catalog()
+    try:
+        etag = service.get_etag(query)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        page = service.get_catalog(query)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    response.headers["ETag"] = etag
+    return page
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
+from app.core.etag import etag_matches, not_modified
 from app.core.jwt_bearer import require_permissions
 from app.models.auth import ApiUser
 from app.models.user import User
@@ -9,6 +10,15 @@ router = APIRouter()
 
 
 @router.get("/{id}")
-def get_user_by_id(id: str, user: ApiUser = Depends(require_permissions({"read:user"}))) -> User:
+def get_user_by_id(
+    id: str,
+    request: Request,
+    response: Response,
+    user: ApiUser = Depends(require_permissions({"read:user"})),
+) -> User:
     service = UserService()
+    etag = service.get_etag(id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return service.get_user_by_id(id)
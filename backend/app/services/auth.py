@@ -1,36 +1,37 @@
 import logging
 
-import httpx
 from authlib.jose import jwt
 from fastapi import HTTPException, status
 
+from app.core.jwks import get_jwks_cache, get_unverified_kid
+from app.core.metrics import timer
 from app.models.auth import ApiUser
-from app.models.settings import Settings
+from app.models.settings import Settings, get_settings
 
 
 class AuthorizationService:
+    def __init__(self, config: Settings | None = None):
+        self.config = config or get_settings()
+
     async def get_claims(self, token: str) -> ApiUser:
-        config = Settings()
+        config = self.config
         AUTH0_DOMAIN = config.auth0_domain
         API_AUDIENCE = config.auth0_audience
 
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(jwks_url)
-            response.raise_for_status()
-            jwks = response.json()
+        jwks = await get_jwks_cache().get_key_set(get_unverified_kid(token))
 
         try:
-            claims = jwt.decode(
-                token,
-                jwks,
-                claims_options={
-                    "iss": {"essential": True, "values": [f"https://{AUTH0_DOMAIN}/"]},
-                    "aud": {"essential": True, "values": [API_AUDIENCE]},
-                    "exp": {"essential": True},
-                },
-            )
-            claims.validate()
+            with timer("jwt_verify"):
+                claims = jwt.decode(
+                    token,
+                    jwks,
+                    claims_options={
+                        "iss": {"essential": True, "values": [f"https://{AUTH0_DOMAIN}/"]},
+                        "aud": {"essential": True, "values": [API_AUDIENCE]},
+                        "exp": {"essential": True},
+                    },
+                )
+                claims.validate()
             logging.info(f"Decoded claims: {claims}")
             user_id = claims.get("sub")
             if not user_id:
@@ -41,7 +42,7 @@ class AuthorizationService:
                 )
 
             permissions = set(claims.get("permissions", []))
-            return ApiUser(id=user_id, permissions=permissions)
+            return ApiUser(id=user_id, permissions=permissions, expires_at=claims.get("exp"))
         except Exception as e:
             logging.error(f"Error decoding JWT: {e}", exc_info=True)
             raise HTTPException(
@@ -1,21 +1,227 @@
+import base64
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import math
+from collections.abc import Iterable
+from functools import lru_cache
+from operator import itemgetter
+
 import faker
 
-from app.models.catalog import Product
+from app.core.etag import make_etag
+from app.models.catalog import CatalogQuery, Product, ProductPage
+from app.models.settings import get_settings
+
+SORT_FIELDS = ("id", "price", "stock")
+RANGE_FILTERS = {"price": ("min_price", "max_price"), "stock": ("min_stock", "max_stock")}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class CatalogStore:
+    """Immutable in-memory catalog with one sorted index per sortable field.
+
+    Each index holds `(value, id)` keys in order, so a page is a binary search to the cursor position
+    followed by a walk of the sort index until `limit` entries match. When a range filter on another field
+    is selective enough that the walk would skip most entries, the page is instead picked from the products
+    within that filter's range on its own index.
+    """
+
+    def __init__(self, products: list[Product]):
+        self.products = sorted(products, key=lambda product: product.id)
+        # Field values by position, so filters are checked without touching the models
+        self.columns = {field: [getattr(product, field) for product in self.products] for field in SORT_FIELDS}
+        self.indexes: dict[str, tuple[list[tuple], list[int]]] = {}
+        for field in SORT_FIELDS:
+            column, ids = self.columns[field], self.columns["id"]
+            positions = sorted(range(len(self.products)), key=lambda i: (column[i], ids[i]))
+            keys = [(column[i], ids[i]) for i in positions]
+            self.indexes[field] = (keys, positions)
+        self.version = self._compute_version(self.products)
+
+    def query(self, query: CatalogQuery) -> ProductPage:
+        keys, _ = self.indexes[query.sort_by]
+        descending = query.order == "desc"
+        lo, hi = self._get_range(query.sort_by, query)
+        last_key = self._decode_cursor(query.cursor, query) if query.cursor else None
+        if last_key is not None:
+            if descending:
+                hi = min(hi, bisect.bisect_left(keys, last_key))
+            else:
+                lo = max(lo, bisect.bisect_right(keys, last_key))
+
+        filter_ranges = {
+            field: self._get_range(field, query)
+            for field, (min_name, max_name) in RANGE_FILTERS.items()
+            if field != query.sort_by and (getattr(query, min_name) is not None or getattr(query, max_name) is not None)
+        }
+        narrowest = min(filter_ranges.items(), key=lambda item: item[1][1] - item[1][0], default=None)
+        if narrowest is not None and self._is_cheaper_to_filter(narrowest[1], filter_ranges.values(), hi - lo, query):
+            page = self._page_from_filter_index(narrowest[0], *narrowest[1], query, last_key)
+        else:
+            page = self._page_from_sort_index(lo, hi, query)
+
+        has_more = len(page) > query.limit
+        page = page[: query.limit]
+        next_cursor = self._encode_cursor(page[-1][0]) if has_more else None
+        return ProductPage(items=[self.products[position] for _, position in page], next_cursor=next_cursor)
+
+    def validate(self, query: CatalogQuery) -> None:
+        """Raise `InvalidCursorError` if the query's cursor cannot be decoded for its sort field."""
+        if query.cursor:
+            self._decode_cursor(query.cursor, query)
+
+    def _page_from_sort_index(self, lo: int, hi: int, query: CatalogQuery) -> list[tuple[tuple, int]]:
+        """Walk the sort index in order and keep the first `limit + 1` matching entries."""
+        keys, positions = self.indexes[query.sort_by]
+        checks = self._get_checks(query, skip=query.sort_by)
+        steps = range(hi - 1, lo - 1, -1) if query.order == "desc" else range(lo, hi)
+        page = []
+        for step in steps:
+            position = positions[step]
+            for column, minimum, maximum in checks:
+                if not minimum <= column[position] <= maximum:
+                    break
+            else:
+                page.append((keys[step], position))
+                if len(page) > query.limit:
+                    break
+        return page
+
+    def _page_from_filter_index(
+        self, field: str, lo: int, hi: int, query: CatalogQuery, last_key: tuple | None
+    ) -> list[tuple[tuple, int]]:
+        """Collect the matching entries within `field`'s range and keep the first `limit + 1` in sort order."""
+        _, positions = self.indexes[field]
+        checks = self._get_checks(query, skip=field)
+        sort_column, ids = self.columns[query.sort_by], self.columns["id"]
+        descending = query.order == "desc"
+        matches = []
+        for step in range(lo, hi):
+            position = positions[step]
+            key = (sort_column[position], ids[position])
+            if last_key is not None and (key >= last_key if descending else key <= last_key):
+                continue
+            for column, minimum, maximum in checks:
+                if not minimum <= column[position] <= maximum:
+                    break
+            else:
+                matches.append((key, position))
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(query.limit + 1, matches, key=itemgetter(0))
+
+    def _is_cheaper_to_filter(
+        self, narrowest: tuple[int, int], filter_ranges: Iterable[tuple[int, int]], sort_range: int, query: CatalogQuery
+    ) -> bool:
+        """Compare the entries in the narrowest filter's range with the ones the sort index walk is expected to
+        visit: `limit + 1` matches at the filters' combined share of the catalog, taking the fields as independent."""
+        matching = narrowest[1] - narrowest[0]
+        if matching == 0:
+            return True
+        share = math.prod((hi - lo) / len(self.products) for lo, hi in filter_ranges)
+        if share == 0:
+            return True
+        return matching < min(sort_range, (query.limit + 1) / share)
+
+    def _get_checks(self, query: CatalogQuery, skip: str) -> list[tuple[list, float, float]]:
+        """The query's range filters other than the one on `skip`, as `(column, minimum, maximum)`."""
+        checks = []
+        for field, (min_name, max_name) in RANGE_FILTERS.items():
+            minimum, maximum = getattr(query, min_name), getattr(query, max_name)
+            if field != skip and (minimum is not None or maximum is not None):
+                checks.append(
+                    (
+                        self.columns[field],
+                        float("-inf") if minimum is None else minimum,
+                        float("inf") if maximum is None else maximum,
+                    )
+                )
+        return checks
+
+    @staticmethod
+    def _compute_version(products: list[Product]) -> str:
+        digest = hashlib.sha256()
+        for product in products:
+            digest.update(product.model_dump_json().encode())
+        return digest.hexdigest()
+
+    def _get_range(self, field: str, query: CatalogQuery) -> tuple[int, int]:
+        """Narrow `field`'s index to the query's filter range on that field."""
+        keys, _ = self.indexes[field]
+        lo, hi = 0, len(keys)
+        if field in RANGE_FILTERS:
+            min_name, max_name = RANGE_FILTERS[field]
+            minimum, maximum = getattr(query, min_name), getattr(query, max_name)
+            if minimum is not None:
+                lo = bisect.bisect_left(keys, (minimum, float("-inf")))
+            if maximum is not None:
+                hi = bisect.bisect_right(keys, (maximum, float("inf")))
+        # A minimum above the maximum leaves nothing, not a negative range
+        return lo, max(lo, hi)
+
+    @staticmethod
+    def _encode_cursor(key: tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, query: CatalogQuery) -> tuple:
+        try:
+            value, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return (int(value) if query.sort_by != "price" else float(value), int(product_id))
+        except Exception as e:
+            raise InvalidCursorError(f"Invalid cursor: {e}")
+
+
+def generate_products(count: int, seed: int) -> list[Product]:
+    """Generate the same fake catalog for the same seed."""
+    fake = faker.Faker()
+    fake.seed_instance(seed)
+    return [
+        Product(
+            id=i + 1,
+            name=fake.name(),
+            description=fake.text(),
+            price=float(fake.pydecimal(left_digits=3, right_digits=2, positive=True)),
+            stock=fake.random_int(min=0, max=100),
+        )
+        for i in range(count)
+    ]
+
+
+def load_products(path: str) -> list[Product]:
+    with open(path, encoding="utf-8") as file:
+        return [Product.model_validate(item) for item in json.load(file)]
+
+
+@lru_cache()
+def get_catalog_store() -> CatalogStore:
+    config = get_settings()
+    if config.catalog_file:
+        products = load_products(config.catalog_file)
+    else:
+        products = generate_products(config.catalog_size, config.catalog_seed)
+    logging.info(f"Catalog loaded with {len(products)} products.")
+    return CatalogStore(products)
 
 
 class CatalogService:
-    def __init__(self):
-        self.faker = faker.Faker()
-
-    def get_catalog(self, count: int = 10) -> list:
-        """Generate a list of fake catalog items."""
-        return [
-            Product(
-                id=i + 1,
-                name=self.faker.name(),
-                description=self.faker.text(),
-                price=self.faker.pydecimal(left_digits=3, right_digits=2, positive=True),
-                stock=self.faker.random_int(min=0, max=100),
-            )
-            for i in range(count)
-        ]
+    def __init__(self, store: CatalogStore | None = None):
+        self.store = store or get_catalog_store()
+
+    def get_catalog(self, query: CatalogQuery) -> ProductPage:
+        """Return one page of the catalog."""
+        return self.store.query(query)
+
+    def get_etag(self, query: CatalogQuery) -> str:
+        """ETag of a page, derived from the catalog version and the query without building the page.
+
+        Validates the query first, so a malformed cursor is rejected even when the client sends a matching
+        `If-None-Match`.
+        """
+        self.store.validate(query)
+        return make_etag(self.store.version, query.model_dump_json())
@@ -1,16 +1,28 @@
+from functools import lru_cache
+
 from faker import Faker
 
+from app.core.etag import make_etag
 from app.models.user import User
 
 
-class UserService:
-    def __init__(self):
-        self.faker = Faker()
+@lru_cache(maxsize=10000)
+def _generate_user(user_id: str) -> tuple[User, str]:
+    # Seeded by id so the same user always gets the same profile, and therefore the same ETag
+    faker = Faker()
+    faker.seed_instance(user_id)
+    user = User(
+        id=user_id,
+        username=faker.user_name(),
+        email=faker.email(),
+        full_name=faker.name(),
+    )
+    return user, make_etag(user.model_dump_json())
+
 
+class UserService:
     def get_user_by_id(self, user_id: str) -> User:
-        return User(
-            id=user_id,
-            username=self.faker.user_name(),
-            email=self.faker.email(),
-            full_name=self.faker.name(),
-        )
+        return _generate_user(user_id)[0]
+
+    def get_etag(self, user_id: str) -> str:
+        return _generate_user(user_id)[1]
@@ -0,0 +1,83 @@
+"""Cost of authenticating a bearer token: full RS256 verification against the cached JWKS, a hit in the
+verified token cache, and the unverified `kid` lookup done before every verification.
+
+The key set is loaded into the JWKS cache up front, so no network is involved.
+
+    uv run python -m benchmarks.jwt_verify --iterations 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import timeit
+
+from authlib.jose import JsonWebKey, jwt
+
+os.environ.setdefault("AUTH0_DOMAIN", "auth0.invalid")
+os.environ.setdefault("AUTH0_AUDIENCE", "https://api.invalid")
+
+
+def make_tokens(key, count: int) -> list[str]:
+    now = int(time.time())
+    return [
+        jwt.encode(
+            {"alg": "RS256", "kid": "benchmark"},
+            {
+                "iss": f"https://{os.environ['AUTH0_DOMAIN']}/",
+                "sub": f"auth0|benchmark-user-{i}",
+                "aud": [os.environ["AUTH0_AUDIENCE"]],
+                "iat": now,
+                "exp": now + 3600,
+                "permissions": ["read:products", "read:user"],
+            },
+            key,
+        ).decode()
+        for i in range(count)
+    ]
+
+
+async def time_async(operation, tokens: list[str]) -> float:
+    started = time.perf_counter()
+    for token in tokens:
+        await operation(token)
+    return (time.perf_counter() - started) / len(tokens)
+
+
+def report(name: str, seconds: float):
+    print(f"  {name:<44} {seconds * 1e6:9.2f} us/op")
+
+
+async def run(iterations: int):
+    from app.core.jwks import get_jwks_cache, get_unverified_kid
+    from app.core.jwt_bearer import authenticate
+    from app.core.token_cache import get_token_cache
+    from app.services.auth import AuthorizationService
+
+    key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": "benchmark"})
+    jwks = get_jwks_cache()
+    jwks.key_set = JsonWebKey.import_key_set({"keys": [key.as_dict()]})
+    jwks.kids = {"benchmark"}
+    jwks.expires_at = jwks.refresh_at = jwks.fetched_at = time.monotonic() + 3600
+
+    tokens = make_tokens(key, iterations)
+    service = AuthorizationService()
+    print(f"{iterations} distinct RS256 tokens")
+    report("get_unverified_kid", timeit.timeit(lambda: get_unverified_kid(tokens[0]), number=iterations) / iterations)
+    report("verify signature and claims", await time_async(service.get_claims, tokens))
+
+    cache = get_token_cache()
+    cache.clear()
+    report("authenticate, token cache miss", await time_async(authenticate, tokens))
+    report("authenticate, token cache hit", await time_async(authenticate, tokens))
+    print(f"  token cache: {cache.hits} hits, {cache.misses} misses, {cache.evictions} evictions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    asyncio.run(run(parser.parse_args().iterations))
+
+
+if __name__ == "__main__":
+    main()
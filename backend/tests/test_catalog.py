@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from app.models.catalog import CatalogQuery, Product
+from app.services.catalog import CatalogService, CatalogStore, InvalidCursorError
+
+SIZES = (0, 1, 7, 60, 500, 2000)
+
+
+def make_products(count: int, rng: random.Random) -> list[Product]:
+    # Few distinct prices and stocks, so ties between equal values are common
+    return [
+        Product(
+            id=i + 1,
+            name=f"product {i + 1}",
+            description="",
+            price=rng.choice([round(rng.uniform(0.01, 999.99), 2), float(rng.randint(1, 20))]),
+            stock=rng.randint(0, 100),
+        )
+        for i in rng.sample(range(count), count)
+    ]
+
+
+def random_query(rng: random.Random) -> dict:
+    params = {
+        "sort_by": rng.choice(["id", "price", "stock"]),
+        "order": rng.choice(["asc", "desc"]),
+        "limit": rng.choice([1, 3, 24, 50, 200]),
+    }
+    for field, upper, draw in (("price", 1000.0, rng.uniform), ("stock", 100, rng.randint)):
+        kind = rng.choice(["none", "min", "max", "range", "narrow", "inverted", "empty"])
+        low, high = sorted((draw(0, upper), draw(0, upper)))
+        if kind == "min":
+            params[f"min_{field}"] = low
+        elif kind == "max":
+            params[f"max_{field}"] = high
+        elif kind == "range":
+            params[f"min_{field}"], params[f"max_{field}"] = low, high
+        elif kind == "narrow":
+            params[f"min_{field}"] = params[f"max_{field}"] = draw(0, upper)
+        elif kind == "inverted":
+            params[f"min_{field}"], params[f"max_{field}"] = high + 1, low
+        elif kind == "empty":
+            params[f"min_{field}"] = upper + 1
+    return params
+
+
+def expected_ids(products: list[Product], query: CatalogQuery) -> list[int]:
+    def matches(product: Product) -> bool:
+        for field in ("price", "stock"):
+            minimum, maximum = getattr(query, f"min_{field}"), getattr(query, f"max_{field}")
+            value = getattr(product, field)
+            if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                return False
+        return True
+
+    selected = sorted(
+        (product for product in products if matches(product)),
+        key=lambda product: (getattr(product, query.sort_by), product.id),
+        reverse=query.order == "desc",
+    )
+    return [product.id for product in selected]
+
+
+def page_through(store: CatalogStore, query: CatalogQuery) -> list[int]:
+    ids = []
+    while True:
+        page = store.query(query)
+        assert len(page.items) <= query.limit
+        ids.extend(product.id for product in page.items)
+        if page.next_cursor is None:
+            return ids
+        assert len(page.items) == query.limit
+        query = query.model_copy(update={"cursor": page.next_cursor})
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_pages_match_naive_filter_and_sort(size: int):
+    rng = random.Random(size)
+    products = make_products(size, rng)
+    store = CatalogStore(products)
+    for _ in range(150):
+        query = CatalogQuery(**random_query(rng))
+        assert page_through(store, query) == expected_ids(products, query), query
+
+
+def test_inverted_range_returns_empty_page():
+    store = CatalogStore(make_products(60, random.Random(0)))
+    query = CatalogQuery(limit=24, sort_by="id", order="desc", min_price=32.26, max_price=7.08, max_stock=1)
+    page = store.query(query)
+    assert page.items == []
+    assert page.next_cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bnVsbA==", "WzEsMiwzXQ=="])
+def test_malformed_cursor_is_rejected(cursor: str):
+    store = CatalogStore(make_products(7, random.Random(0)))
+    with pytest.raises(InvalidCursorError):
+        store.query(CatalogQuery(cursor=cursor))
+
+
+def test_etag_is_not_computed_for_a_malformed_cursor():
+    service = CatalogService(CatalogStore(make_products(7, random.Random(0))))
+    with pytest.raises(InvalidCursorError):
+        service.get_etag(CatalogQuery(cursor="not-base64!"))
@@ -1,10 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
 import redis.asyncio as redis
 
-from app.models.settings import Settings
+from app.models.settings import get_settings
+
+# Created on first use, so every worker process builds its own pool on its own event loop
+redis_client: redis.Redis | None = None
+
+
+class CacheStats:
+    """Counters for Redis usage, read by the metrics endpoint."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.commands = 0
+
+    def record(self, commands: int = 1):
+        self.round_trips += 1
+        self.commands += commands
+
+
+cache_stats = CacheStats()
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with a TTL per entry."""
 
-config = Settings()
-redis_client = redis.from_url(config.redis_url, decode_responses=True)
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            self.entries.pop(key, None)
+            return
+
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
 
 
 def get_cache() -> redis.Redis:
+    global redis_client
+    if redis_client is None:
+        config = get_settings()
+        pool = redis.BlockingConnectionPool.from_url(
+            config.redis_url,
+            decode_responses=True,
+            max_connections=config.redis_max_connections,
+            timeout=config.redis_pool_timeout,
+        )
+        redis_client = redis.Redis.from_pool(pool)
     return redis_client
+
+
+async def close_cache():
+    """Close the pool's connections. The client stays usable and reconnects if it is used again."""
+    if redis_client is not None:
+        await redis_client.aclose()
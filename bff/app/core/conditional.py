@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import Request, Response, status
+
+from app.core.cache import LocalCache
+from app.models.settings import get_settings
+
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class CachedRepresentation:
+    """A backend response body kept with its validator so it can be revalidated with `If-None-Match`."""
+
+    etag: str | None
+    content: bytes
+    media_type: str
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate the client's `If-None-Match` against `etag` using weak comparison, as RFC 9110 requires."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def conditional_response(request: Request, representation: CachedRepresentation) -> Response:
+    """Answer the client with 304 if it already holds this representation, otherwise with the cached bytes."""
+    if representation.etag is None:
+        return Response(content=representation.content, media_type=representation.media_type)
+    if etag_matches(request, representation.etag):
+        return not_modified(representation.etag)
+    return Response(
+        content=representation.content,
+        media_type=representation.media_type,
+        headers={"ETag": representation.etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+@lru_cache()
+def get_validator_cache() -> LocalCache:
+    """Per-worker cache of backend representations, keyed by user and request."""
+    config = get_settings()
+    return LocalCache(config.validator_cache_size, config.validator_cache_ttl)
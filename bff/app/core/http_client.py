@@ -2,32 +2,102 @@ import logging
 
 import httpx
 from fastapi import Request
+from fastapi.responses import StreamingResponse
 
-from app.services.tokens import TokenManager
+from app.core.resilience import ResilientTransport, get_upstream
+from app.core.session import get_session
+from app.models.settings import Settings
 
+try:
+    import h2
+except ImportError:  # Optional: install the `http2` extra to talk HTTP/2 to the backend
+    h2 = None
 
-class SecureHttpClient(httpx.AsyncClient):
-    def __init__(self, request: Request, *args, **kwargs):
-        kwargs.setdefault("verify", False)
-        super().__init__(*args, **kwargs)
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        b"connection",
+        b"keep-alive",
+        b"proxy-authenticate",
+        b"proxy-authorization",
+        b"te",
+        b"trailer",
+        b"transfer-encoding",
+        b"upgrade",
+    }
+)
+
+
+class SessionTokenAuth(httpx.Auth):
+    """Adds the session's access token to outgoing requests and retries once with a refreshed token."""
+
+    def __init__(self, request: Request):
         self.http_request = request
-        self.token_manager = TokenManager()
 
-    async def send(self, request: httpx.Request, **kwargs):
-        logging.info(f"[SecureHttpClient] Sending: {request.method} {request.url}")
-        access_token = await self.token_manager.get_access_token(self.http_request)
+    async def async_auth_flow(self, request: httpx.Request):
+        logging.info(f"[SessionTokenAuth] Sending: {request.method} {request.url}")
+        session = await get_session(self.http_request)
+        access_token = await session.get_access_token()
         if access_token:
             request.headers["Authorization"] = f"Bearer {access_token}"
-        response = await super().send(request, **kwargs)
-        if response.status_code == httpx.codes.UNAUTHORIZED or response.status_code == httpx.codes.FORBIDDEN:
+        response = yield request
+        # Only a 401 means the token was rejected, a 403 is a missing permission that a new token will not grant
+        if response.status_code == httpx.codes.UNAUTHORIZED:
             logging.warning("Access token expired or invalid, refreshing token.")
-            await self.token_manager.refresh(self.http_request)
-            access_token = await self.token_manager.get_access_token(self.http_request)
+            access_token = await session.refresh(rejected_token=access_token)
+            if not isinstance(request.stream, httpx.ByteStream):
+                # A streamed request body has been consumed and cannot be sent again, relay the rejection
+                return
             if access_token:
                 request.headers["Authorization"] = f"Bearer {access_token}"
-                response = await super().send(request, **kwargs)
+                response = yield request
             else:
                 logging.error("Failed to refresh access token.")
                 raise httpx.HTTPStatusError("Unauthorized", request=request, response=response)
-        logging.info(f"[SecureHttpClient] Got: {response.status_code}")
-        return response
+        logging.info(f"[SessionTokenAuth] Got: {response.status_code}")
+
+    def sync_auth_flow(self, request: httpx.Request):
+        raise RuntimeError("SessionTokenAuth only supports async clients.")
+
+
+def create_http_client(config: Settings) -> httpx.AsyncClient:
+    """Create the application-wide connection pool used for BFF-to-backend calls."""
+    http2 = config.backend_http2
+    if http2 and h2 is None:
+        logging.warning("backend_http2 is set but the http2 extra is not installed, using HTTP/1.1.")
+        http2 = False
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        verify=config.backend_verify_ssl,
+        limits=httpx.Limits(
+            max_connections=config.backend_max_connections,
+            max_keepalive_connections=config.backend_max_keepalive_connections,
+            keepalive_expiry=config.backend_keepalive_expiry,
+        ),
+    )
+    return httpx.AsyncClient(
+        base_url=config.backend_url.strip("/"),
+        transport=ResilientTransport(get_upstream("backend", config.backend_resilience), transport),
+        timeout=httpx.Timeout(config.backend_timeout, connect=config.backend_connect_timeout),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http_client
+
+
+async def relay_response(client: httpx.AsyncClient, request: httpx.Request, auth: httpx.Auth) -> StreamingResponse:
+    """Send `request` and relay the backend's response chunk by chunk, with the body still encoded as it was sent."""
+    response = await client.send(request, auth=auth, stream=True, follow_redirects=True)
+    relayed = StreamingResponse(_iter_raw(response), status_code=response.status_code)
+    relayed.raw_headers = [
+        (name, value) for name, value in response.headers.raw if name.lower() not in HOP_BY_HOP_HEADERS
+    ]
+    return relayed
+
+
+async def _iter_raw(response: httpx.Response):
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
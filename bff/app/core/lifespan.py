@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.core.cache import close_cache, get_cache
+from app.core.http_client import create_http_client
+from app.models.settings import get_settings, install_reload_handler
+from app.services.authentication import get_auth_service
+from app.services.encryption import get_encryption_service
+from app.services.tokens import get_token_manager, wait_for_refreshes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Resources of one worker process. They are created and warmed before uvicorn accepts connections, so
+    the first requests do not pay for them, and closed on shutdown."""
+    config = get_settings()
+    install_reload_handler()
+    # Key derivation is deliberately slow
+    get_encryption_service()
+    auth_service = get_auth_service()
+    auth_service.setup()
+    await asyncio.gather(
+        _warm_up("Redis connection", get_cache().ping(), config.warm_up_timeout),
+        _warm_up("OIDC discovery document", auth_service.prewarm(), config.warm_up_timeout),
+    )
+    app.state.http_client = create_http_client(config)
+    invalidation_listener = asyncio.create_task(get_token_manager().listen_for_invalidations())
+    try:
+        yield
+    finally:
+        invalidation_listener.cancel()
+        await wait_for_refreshes(config.shutdown_timeout)
+        await app.state.http_client.aclose()
+        await auth_service.aclose()
+        await close_cache()
+
+
+async def _warm_up(name: str, warm_up: Awaitable, timeout: float):
+    # A dependency that is down at startup should not keep the worker from starting
+    try:
+        await asyncio.wait_for(warm_up, timeout)
+        logging.info(f"{name} ready.")
+    except Exception as e:
+        logging.warning(f"{name} could not be loaded at startup: {str(e) or type(e).__name__}")
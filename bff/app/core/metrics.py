@@ -0,0 +1,178 @@
+import logging
+import time
+from contextlib import nullcontext
+
+from fastapi import FastAPI, Request, Response
+
+from app.models.settings import get_settings
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # Optional: install the `metrics` extra to enable metrics
+    prometheus_client = None
+
+_NOOP = nullcontext()
+
+registry = None
+request_seconds = None
+requests_in_flight = None
+stage_seconds = None
+
+
+def timer(stage: str):
+    """Time a hot-path stage. When metrics are disabled this is a shared no-op context manager."""
+    if stage_seconds is None:
+        return _NOOP
+    return stage_seconds.labels(stage).time()
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram and in-flight gauge. Routes are labelled by their path template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = route_label(scope)
+            request_seconds.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def route_label(scope) -> str:
+    """Path template of the matched route, including router prefixes, so labels stay low-cardinality."""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = route.path_format
+    try:
+        rendered = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    # Routers may be mounted, in which case the route only knows the part of the path below its prefix
+    return path[: len(path) - len(rendered)] + template if path.endswith(rendered) else template
+
+
+class StateCollector:
+    """Reads the counters the caches and upstream guards already keep, so they cost nothing until scraped."""
+
+    def collect(self):
+        from app.core.cache import cache_stats
+        from app.core.conditional import get_validator_cache
+        from app.core.resilience import CircuitBreaker, upstreams
+        from app.core.response_cache import get_response_cache
+        from app.services.tokens import get_token_manager
+
+        redis_round_trips = CounterMetricFamily("bff_redis_round_trips", "Redis round trips")
+        redis_round_trips.add_metric([], cache_stats.round_trips)
+        yield redis_round_trips
+        redis_commands = CounterMetricFamily("bff_redis_commands", "Redis commands sent")
+        redis_commands.add_metric([], cache_stats.commands)
+        yield redis_commands
+
+        local_caches = {
+            "session": get_token_manager().local_cache,
+            "validator": get_validator_cache(),
+            "response_local": get_response_cache().local_cache,
+        }
+        cache_requests = CounterMetricFamily(
+            "bff_cache_requests", "In-process cache lookups", labels=["cache", "result"]
+        )
+        cache_evictions = CounterMetricFamily("bff_cache_evictions", "In-process cache evictions", labels=["cache"])
+        for name, cache in local_caches.items():
+            if cache is None:
+                continue
+            cache_requests.add_metric([name, "hit"], cache.hits)
+            cache_requests.add_metric([name, "miss"], cache.misses)
+            cache_evictions.add_metric([name], cache.evictions)
+        yield cache_requests
+        yield cache_evictions
+
+        response_cache = CounterMetricFamily(
+            "bff_response_cache_requests", "Response cache lookups by outcome", labels=["result"]
+        )
+        for result, count in get_response_cache().outcomes.items():
+            response_cache.add_metric([result], count)
+        yield response_cache
+
+        circuit_state = GaugeMetricFamily(
+            "bff_upstream_circuit_state", "1 for the current circuit state", labels=["upstream", "state"]
+        )
+        circuit_opened = CounterMetricFamily(
+            "bff_upstream_circuit_opened", "Times the circuit opened", labels=["upstream"]
+        )
+        in_flight = GaugeMetricFamily(
+            "bff_upstream_in_flight", "Requests in flight to the upstream", labels=["upstream"]
+        )
+        rejected = CounterMetricFamily(
+            "bff_upstream_rejected", "Requests rejected by the bulkhead", labels=["upstream"]
+        )
+        retries = CounterMetricFamily("bff_upstream_retries", "Retried upstream requests", labels=["upstream"])
+        budget_exhausted = CounterMetricFamily(
+            "bff_upstream_retry_budget_exhausted", "Retries skipped for lack of budget", labels=["upstream"]
+        )
+        for name, upstream in upstreams.items():
+            current = upstream.breaker.state
+            for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+                circuit_state.add_metric([name, state], 1 if state == current else 0)
+            circuit_opened.add_metric([name], upstream.breaker.times_opened)
+            in_flight.add_metric([name], upstream.bulkhead.in_flight)
+            rejected.add_metric([name], upstream.bulkhead.rejected)
+            retries.add_metric([name], upstream.retries)
+            budget_exhausted.add_metric([name], upstream.budget.exhausted)
+        yield from (circuit_state, circuit_opened, in_flight, rejected, retries, budget_exhausted)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(prometheus_client.generate_latest(registry), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app: FastAPI):
+    """Add the metrics middleware and `/metrics` when `metrics_enabled` is set."""
+    global registry, request_seconds, requests_in_flight, stage_seconds
+    if not get_settings().metrics_enabled:
+        return
+    if prometheus_client is None:
+        logging.warning("metrics_enabled is set but the metrics extra is not installed, metrics are disabled.")
+        return
+
+    if registry is None:
+        registry = prometheus_client.CollectorRegistry()
+        request_seconds = prometheus_client.Histogram(
+            "bff_request_duration_seconds",
+            "Request latency by route",
+            ["method", "route", "status"],
+            registry=registry,
+        )
+        requests_in_flight = prometheus_client.Gauge(
+            "bff_requests_in_flight", "Requests being handled", registry=registry
+        )
+        stage_seconds = prometheus_client.Histogram(
+            "bff_stage_duration_seconds",
+            "Time spent in hot-path stages",
+            ["stage"],
+            buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+            registry=registry,
+        )
+        registry.register(StateCollector())
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+import httpx
+
+DISCOVERY_PATH = "/.well-known/openid-configuration"
+
+
+class OidcMetadata:
+    """The IdP's OIDC discovery document with TTL, refresh-ahead, single-flight fetches and stale-on-error.
+
+    Until the first fetch succeeds, endpoints fall back to Auth0's fixed paths below `base_url`, so an IdP that
+    is unreachable at startup or during a refresh does not break logins.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        client: Callable[[], httpx.AsyncClient],
+        ttl: float = 3600.0,
+        refresh_ahead: float = 300.0,
+        retry_interval: float = 30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.metadata: dict | None = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        # After a failed fetch, nothing is fetched again before this
+        self.retry_at = 0.0
+        self.fetch_count = 0
+        self._fetch_task: asyncio.Task | None = None
+
+    @property
+    def defaults(self) -> dict:
+        return {
+            "issuer": f"{self.base_url}/",
+            "authorization_endpoint": f"{self.base_url}/authorize",
+            "token_endpoint": f"{self.base_url}/oauth/token",
+            "jwks_uri": f"{self.base_url}/.well-known/jwks.json",
+            "passwordless_start_endpoint": f"{self.base_url}/passwordless/start",
+        }
+
+    async def get(self) -> dict:
+        now = time.monotonic()
+        if now >= self.retry_at:
+            if self.metadata is None or now >= self.expires_at:
+                await self._refresh()
+            elif now >= self.refresh_at:
+                self._start_fetch()
+        return self.metadata or self.defaults
+
+    async def endpoint(self, name: str) -> str:
+        return (await self.get())[name]
+
+    async def aclose(self):
+        if self._fetch_task is not None:
+            self._fetch_task.cancel()
+
+    async def _refresh(self):
+        await asyncio.shield(self._start_fetch())
+
+    def _start_fetch(self) -> asyncio.Task:
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch())
+        return self._fetch_task
+
+    async def _fetch(self):
+        try:
+            response = await self.client().get(f"{self.base_url}{DISCOVERY_PATH}")
+            response.raise_for_status()
+            document = response.json()
+        except Exception as e:
+            # Keep serving what we have and give the IdP some time before the next attempt, in the foreground or
+            # ahead. Set here rather than in a done callback, which would leave a window for another fetch.
+            self.retry_at = self.refresh_at = time.monotonic() + self.retry_interval
+            source = "cached" if self.metadata is not None else "default"
+            logging.warning(f"OIDC discovery failed, using {source} endpoints: {str(e) or type(e).__name__}")
+            return
+
+        # Auth0 does not advertise its passwordless endpoints
+        self.metadata = {**self.defaults, **document, "_loaded_at": time.time()}
+        self.expires_at = time.monotonic() + self.ttl
+        self.refresh_at = self.expires_at - min(self.refresh_ahead, self.ttl / 2)
+        self.fetch_count += 1
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.core.metrics import timer
+from app.models.resilience import ResiliencePolicy
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+
+# Every upstream guarded in this process, by name, for the metrics endpoint
+upstreams: dict[str, "Upstream"] = {}
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Raised without contacting the upstream: its circuit is open or all of its slots are busy."""
+
+    def __init__(self, upstream: str, reason: str, request: httpx.Request, retry_after: float = 1.0):
+        super().__init__(f"{upstream} is unavailable: {reason}", request=request)
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, then lets probes through once `recovery_timeout`
+    has passed. A successful probe closes the circuit, a failed one opens it again."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.times_opened = 0
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self.probes = 0
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self.probes < self.half_open_max_calls:
+            self.probes += 1
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self._state != self.CLOSED:
+            logging.info("Circuit closed.")
+        self._state = self.CLOSED
+
+    def record_abandoned(self):
+        """A call that ended without a verdict on the upstream, e.g. it was cancelled. Counts as a failed probe
+        so a half-open circuit cannot wait forever for an outcome that never comes."""
+        if self._state == self.HALF_OPEN:
+            self.record_failure()
+
+    def record_failure(self):
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+                logging.warning(f"Circuit opened after {self.failures} consecutive failures.")
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Bulkhead:
+    """Caps the requests in flight to one upstream so a slow upstream cannot take every coroutine with it."""
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, upstream: str, request: httpx.Request):
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailable(upstream, "too many requests in flight", request)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+
+class RetryBudget:
+    """Every request earns `ratio` retries, capped at `max_tokens`, so retries cannot multiply an outage."""
+
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.exhausted = 0
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Upstream:
+    def __init__(self, name: str, policy: ResiliencePolicy):
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.recovery_timeout, policy.half_open_max_calls)
+        self.bulkhead = Bulkhead(policy.max_concurrency, policy.queue_timeout)
+        self.budget = RetryBudget(policy.retry_budget)
+        self.retries = 0
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport with a bulkhead, a circuit breaker and jittered retries for idempotent requests.
+
+    Transport errors and 5xx responses count as failures. Only idempotent requests with a replayable body
+    are retried, and only after connection errors, timeouts or 502/503/504.
+    """
+
+    def __init__(self, upstream: Upstream, transport: httpx.AsyncBaseTransport):
+        self.upstream = upstream
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = self.upstream
+        upstream.budget.deposit()
+        attempt = 0
+        while True:
+            async with upstream.bulkhead.slot(upstream.name, request):
+                if not upstream.breaker.allow():
+                    raise UpstreamUnavailable(
+                        upstream.name, "circuit open", request, retry_after=upstream.breaker.retry_after
+                    )
+                try:
+                    with timer(f"{upstream.name}_request"):
+                        response = await self.transport.handle_async_request(request)
+                except httpx.TransportError as e:
+                    upstream.breaker.record_failure()
+                    if not self._should_retry(request, attempt):
+                        raise
+                    logging.warning(f"Retrying {request.method} {request.url.path} on {upstream.name}: {str(e)}")
+                except BaseException:
+                    # Cancelled, or the request body failed to stream
+                    upstream.breaker.record_abandoned()
+                    raise
+                else:
+                    if response.status_code >= 500:
+                        upstream.breaker.record_failure()
+                    else:
+                        upstream.breaker.record_success()
+                    if response.status_code not in RETRYABLE_STATUS_CODES or not self._should_retry(request, attempt):
+                        return response
+                    await response.aclose()
+
+            attempt += 1
+            upstream.retries += 1
+            await asyncio.sleep(random.uniform(0, upstream.policy.retry_backoff * 2**attempt))
+
+    def _should_retry(self, request: httpx.Request, attempt: int) -> bool:
+        return (
+            attempt < self.upstream.policy.retries
+            and request.method in IDEMPOTENT_METHODS
+            and isinstance(request.stream, httpx.ByteStream)
+            and self.upstream.budget.withdraw()
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def get_upstream(name: str, policy: ResiliencePolicy) -> Upstream:
+    """The process-wide guard for `name`, created on first use."""
+    if name not in upstreams:
+        upstreams[name] = Upstream(name, policy)
+    return upstreams[name]
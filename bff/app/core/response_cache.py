@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+import httpx
+import redis.asyncio as redis
+
+from app.core.cache import LocalCache, cache_stats, get_cache
+from app.core.conditional import CachedRepresentation
+from app.models.cache import CacheRule
+from app.models.settings import get_settings
+
+Fetch = Callable[[CachedRepresentation | None], Awaitable[CachedRepresentation]]
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    representation: CachedRepresentation
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+def is_upstream_error(error: Exception) -> bool:
+    """Errors a stale entry may hide: the backend was unreachable or failed, not that access was refused."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class ResponseCache:
+    """Backend responses shared through Redis with a short-lived in-process front tier.
+
+    Fresh entries are served as-is, entries within `stale_while_revalidate` are served while one background
+    fetch refreshes them, and entries within `stale_if_error` are served when the backend fails. Concurrent
+    misses for the same key in this worker share one fetch.
+    """
+
+    def __init__(self, cache: redis.Redis, local_cache: LocalCache):
+        self.cache = cache
+        self.local_cache = local_cache
+        self.fetches: dict[str, asyncio.Task] = {}
+        self.outcomes: Counter[str] = Counter()
+
+    async def get(self, key: str, rule: CacheRule, fetch: Fetch) -> CachedRepresentation:
+        entry = await self._load(key)
+        if entry is not None:
+            age = entry.age()
+            if age < rule.ttl:
+                self.outcomes["fresh"] += 1
+                return entry.representation
+            if age < rule.ttl + rule.stale_while_revalidate:
+                self.outcomes["stale"] += 1
+                self._fetch(key, rule, fetch, entry).add_done_callback(self._log_revalidation_error)
+                return entry.representation
+
+        self.outcomes["miss"] += 1
+        try:
+            entry = await asyncio.shield(self._fetch(key, rule, fetch, entry))
+        except Exception as e:
+            if entry is None or entry.age() >= rule.ttl + rule.stale_if_error or not is_upstream_error(e):
+                raise
+            self.outcomes["stale_if_error"] += 1
+            logging.warning(f"Serving stale response for {key}: {str(e)}")
+        return entry.representation
+
+    def _fetch(self, key: str, rule: CacheRule, fetch: Fetch, entry: CacheEntry | None) -> asyncio.Task:
+        task = self.fetches.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, rule, fetch, entry))
+            self.fetches[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task):
+        self.fetches.pop(key, None)
+        # Callers that timed out no longer await the fetch, so mark its error as seen here
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_and_store(self, key: str, rule: CacheRule, fetch: Fetch, entry: CacheEntry | None) -> CacheEntry:
+        representation = await fetch(entry.representation if entry is not None else None)
+        entry = CacheEntry(representation, time.time())
+        await self._store(key, rule, entry)
+        return entry
+
+    async def _load(self, key: str) -> CacheEntry | None:
+        entry = self.local_cache.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            values = await self.cache.hgetall(f"response:{key}")
+            cache_stats.record()
+        except redis.RedisError as e:
+            logging.warning(f"Response cache unavailable: {str(e)}")
+            return None
+        if not values:
+            return None
+
+        entry = CacheEntry(
+            CachedRepresentation(
+                etag=values.get("etag") or None,
+                content=values["content"].encode(),
+                media_type=values["media_type"],
+            ),
+            float(values["stored_at"]),
+        )
+        self.local_cache.set(key, entry)
+        return entry
+
+    async def _store(self, key: str, rule: CacheRule, entry: CacheEntry):
+        self.local_cache.set(key, entry, ttl=rule.retention)
+        representation = entry.representation
+        try:
+            content = representation.content.decode()
+        except UnicodeDecodeError:
+            return
+
+        try:
+            async with self.cache.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    f"response:{key}",
+                    mapping={
+                        "etag": representation.etag or "",
+                        "content": content,
+                        "media_type": representation.media_type,
+                        "stored_at": str(entry.stored_at),
+                    },
+                )
+                pipe.expire(f"response:{key}", max(1, int(rule.retention)))
+                await pipe.execute()
+            cache_stats.record(commands=2)
+        except redis.RedisError as e:
+            logging.warning(f"Response cache unavailable: {str(e)}")
+
+    @staticmethod
+    def _log_revalidation_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Background revalidation failed: {str(task.exception())}")
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    config = get_settings()
+    return ResponseCache(get_cache(), LocalCache(config.response_cache_local_size, config.response_cache_local_ttl))
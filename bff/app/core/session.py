@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException, Request, Response
+
+from app.services.tokens import SessionRecord, TokenManager, get_token_manager
+
+
+class SessionContext:
+    """The current request's session. The record is loaded once and fields are decrypted on first use."""
+
+    def __init__(self, session_id: str, record: SessionRecord, token_manager: TokenManager):
+        self.session_id = session_id
+        self.record = record
+        self.loaded_record = record
+        self.token_manager = token_manager
+
+    @property
+    def is_refreshed(self) -> bool:
+        return self.record is not self.loaded_record
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.record)
+
+    @property
+    def expires_at(self) -> int:
+        return int(self.record.get("exp") or 0)
+
+    @property
+    def expires_in(self) -> int:
+        return max(0, self.expires_at - int(time.time()))
+
+    @property
+    def is_expired(self) -> bool:
+        return self.token_manager.is_expired(self.record)
+
+    @property
+    def is_active(self) -> bool:
+        """The session can serve requests: its access token is valid or it holds a refresh token for a new one.
+        Read from the record alone, without decrypting anything or calling the IdP."""
+        return self.exists and (not self.is_expired or self.token_manager.can_refresh(self.record))
+
+    async def get_access_token(self) -> str:
+        await self._ensure_fresh()
+        return self._get_field("access_token")
+
+    async def get_claims(self) -> dict:
+        """The compact claims stored with the session; the access token itself is never parsed per request."""
+        await self._ensure_fresh()
+        return self.token_manager.get_claims(self.record)
+
+    async def get_user_id(self) -> str:
+        user_id = (await self.get_claims()).get("sub")
+        if not user_id:
+            raise HTTPException(
+                status_code=401,
+                detail="Session not found. Please log in again.",
+            )
+        return user_id
+
+    async def get_permissions(self) -> frozenset[str]:
+        return frozenset((await self.get_claims()).get("permissions") or ())
+
+    async def refresh(self, rejected_token: str | None = None) -> str:
+        self.record = await self.token_manager.refresh(self.session_id, rejected_token)
+        return self._get_field("access_token")
+
+    async def _ensure_fresh(self):
+        if not self.exists:
+            raise HTTPException(
+                status_code=401,
+                detail="Session not found. Please log in again.",
+            )
+        if self.is_expired:
+            await self.refresh()
+        elif self.token_manager.needs_early_refresh(self.record):
+            refreshed = self.token_manager.get_early_refreshed(self.session_id, self.record)
+            if refreshed is not None:
+                self.record = refreshed
+                return
+            task = self.token_manager.refresh_in_background(self.session_id, self.record)
+            if task is not None:
+                task.add_done_callback(self._on_background_refresh)
+
+    def _on_background_refresh(self, task: asyncio.Task):
+        # Pick up the new token if the refresh finishes while this request is still running
+        if not task.cancelled() and task.exception() is None:
+            self.record = task.result()
+
+    def _get_field(self, name: str) -> str:
+        value = self.token_manager.decrypt_field(self.record, name)
+        if not value:
+            raise HTTPException(
+                status_code=401,
+                detail="Session not found. Please log in again.",
+            )
+        return value
+
+
+async def get_session(request: Request) -> SessionContext:
+    """Resolve the session once per request and cache it on `request.state`."""
+    task = getattr(request.state, "session_task", None)
+    if task is None:
+        token_manager = get_token_manager()
+        if token_manager.cookie_storage:
+            task = asyncio.ensure_future(_read_session(request.cookies, token_manager))
+        else:
+            session_id = request.cookies.get("session_id")
+            if not session_id:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Session ID cookie not found. Please log in again.",
+                )
+            task = asyncio.ensure_future(_load_session(session_id, token_manager))
+        request.state.session_task = task
+    return await task
+
+
+async def _load_session(session_id: str, token_manager: TokenManager) -> SessionContext:
+    record = await token_manager.load_session(session_id)
+    return SessionContext(session_id, record, token_manager)
+
+
+async def _read_session(cookies: dict[str, str], token_manager: TokenManager) -> SessionContext:
+    session = token_manager.read_session_cookie(cookies)
+    if session is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Session cookie not found. Please log in again.",
+        )
+    return SessionContext(*session, token_manager)
+
+
+class SessionCookieMiddleware:
+    """Cookie storage: re-seal the session cookie on the response when the request refreshed the session."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                session = _get_resolved_session(scope)
+                if session is not None and session.is_refreshed:
+                    message["headers"] = [*message.get("headers", ()), *_session_cookie_headers(session)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def _get_resolved_session(scope) -> SessionContext | None:
+    task = scope.get("state", {}).get("session_task")
+    if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+        return None
+    return task.result()
+
+
+def _session_cookie_headers(session: SessionContext) -> list[tuple[bytes, bytes]]:
+    response = Response()
+    try:
+        session.token_manager.set_session_cookie(response, session.session_id, session.record)
+    except Exception as e:
+        logging.error(f"Unable to update the session cookie: {str(e)}")
+        return []
+    return [(name, value) for name, value in response.raw_headers if name == b"set-cookie"]
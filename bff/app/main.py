@@ -1,30 +1,50 @@
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 
-from app.models.settings import Settings
-from app.routes import auth, catalog, users
-from app.services.authentication import get_auth_service
+from app.core.lifespan import lifespan
+from app.core.metrics import setup_metrics
+from app.core.resilience import UpstreamUnavailable
+from app.core.session import SessionCookieMiddleware
+from app.models.settings import get_settings
+from app.routes import auth, bootstrap, catalog, proxy, users
 
 logging.basicConfig(level=logging.INFO)
-app = FastAPI()
+config = get_settings()
 
-# Initialize settings and middleware
-config = Settings()
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    logging.warning(f"Failing fast: {str(exc)}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"{exc.upstream} is temporarily unavailable. Please try again later."},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+# Initialize middleware
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.cors_allow_origins.split(","),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 app.add_middleware(SessionMiddleware, secret_key=config.app_secret_key)
-auth_service = get_auth_service()
-auth_service.setup()
+if config.session_storage == "cookie":
+    app.add_middleware(SessionCookieMiddleware)
+setup_metrics(app)
 
 # Include routes
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
+app.include_router(bootstrap.router, prefix="/bootstrap", tags=["bootstrap"])
 app.include_router(catalog.router, prefix="/catalog", tags=["catalog"])
 app.include_router(users.router, prefix="/users", tags=["users"])
+app.include_router(proxy.router, prefix="/api", tags=["proxy"])
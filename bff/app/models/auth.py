@@ -9,6 +9,8 @@ class UserTokens(BaseModel):
 
 class AuthStatusResponse(BaseModel):
     is_authenticated: bool
+    # Seconds until the current access token expires; 0 means it is refreshed on the next request
+    expires_in: int | None = None
 
 
 class SendOtpRequest(BaseModel):
@@ -0,0 +1,15 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BootstrapPart(BaseModel):
+    ok: bool
+    data: Any = None
+    error: str | None = None
+
+
+class BootstrapResponse(BaseModel):
+    is_authenticated: bool
+    user: BootstrapPart | None = None
+    catalog: BootstrapPart | None = None
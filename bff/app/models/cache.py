@@ -0,0 +1,18 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class CacheRule(BaseModel):
+    scope: Literal["global", "permissions", "user"] = Field(
+        "user", description="Who shares an entry: everyone, users with the same permissions, or one user"
+    )
+    ttl: float = Field(..., ge=0, description="Seconds an entry is served without contacting the backend")
+    stale_while_revalidate: float = Field(
+        0, ge=0, description="Seconds after `ttl` an entry is still served while it is refreshed in the background"
+    )
+    stale_if_error: float = Field(0, ge=0, description="Seconds after `ttl` an entry is served if the backend fails")
+
+    @property
+    def retention(self) -> float:
+        return self.ttl + max(self.stale_while_revalidate, self.stale_if_error)
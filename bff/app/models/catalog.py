@@ -0,0 +1,14 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class CatalogQuery(BaseModel):
+    cursor: str | None = Field(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+    limit: int = Field(50, ge=1, le=200, description="Maximum number of products to return")
+    sort_by: Literal["id", "price", "stock"] = Field("id", description="Field to sort by")
+    order: Literal["asc", "desc"] = Field("asc", description="Sort direction")
+    min_price: float | None = Field(None, ge=0, description="Only products with at least this price")
+    max_price: float | None = Field(None, ge=0, description="Only products with at most this price")
+    min_stock: int | None = Field(None, ge=0, description="Only products with at least this stock")
+    max_stock: int | None = Field(None, ge=0, description="Only products with at most this stock")
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class ProxyRoute(BaseModel):
+    methods: list[str] = Field(["GET"], description="HTTP methods forwarded for this prefix")
+    timeout: float = Field(10.0, gt=0, description="Seconds allowed for the backend call")
+    max_body_size: int = Field(1_048_576, ge=0, description="Largest request body forwarded, in bytes")
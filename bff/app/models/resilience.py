@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+
+class ResiliencePolicy(BaseModel):
+    max_concurrency: int = Field(50, ge=1, description="Requests allowed in flight to the upstream at once")
+    queue_timeout: float = Field(1.0, ge=0, description="Seconds a request may wait for a slot before failing fast")
+    failure_threshold: int = Field(5, ge=1, description="Consecutive failures that open the circuit")
+    recovery_timeout: float = Field(10.0, gt=0, description="Seconds the circuit stays open before a probe")
+    half_open_max_calls: int = Field(1, ge=1, description="Probe requests allowed while the circuit is half-open")
+    retries: int = Field(2, ge=0, description="Retries for idempotent requests that failed transiently")
+    retry_backoff: float = Field(0.1, ge=0, description="Base of the jittered exponential backoff, in seconds")
+    retry_budget: float = Field(0.2, ge=0, description="Retries allowed per request on average")
@@ -1,16 +1,100 @@
+import asyncio
+import logging
+import signal
+from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.models.cache import CacheRule
+from app.models.proxy import ProxyRoute
+from app.models.resilience import ResiliencePolicy
+
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
     auth0_client_id: str
     auth0_client_secret: str
     auth0_domain: str
     auth0_audience: str
     auth0_callback_url: str
+    auth0_base_url: str | None = None
+    auth0_timeout: float = 10.0
+    auth0_connect_timeout: float = 5.0
+    auth0_max_connections: int = 20
+    auth0_resilience: ResiliencePolicy = ResiliencePolicy(max_concurrency=20, recovery_timeout=30.0)
+    oidc_metadata_ttl: float = 3600.0
+    oidc_metadata_refresh_ahead: float = 300.0
+    oidc_metadata_retry_interval: float = 30.0
     app_secret_key: str
     app_secret_salt: str
+    app_secret_key_version: int = 1
+    app_previous_secret_keys: str = ""
     redis_url: str
+    # Per worker process; requests wait up to `redis_pool_timeout` for a free connection
+    redis_max_connections: int = 100
+    redis_pool_timeout: float = 5.0
+    # "cookie" seals the access token into the session cookie; Redis then only takes part in logins and refreshes
+    session_storage: Literal["redis", "cookie"] = "redis"
+    refresh_lock_timeout: float = 10.0
+    refresh_poll_interval: float = 0.05
+    refresh_ahead_window: float = 60.0
+    session_cache_enabled: bool = False
+    session_cache_size: int = 10000
+    session_cache_ttl: float = 30.0
+    auth_status_max_age: int = 10
     backend_url: str
+    # Needs the `http2` extra
+    backend_http2: bool = False
+    backend_verify_ssl: bool = False
+    backend_max_connections: int = 100
+    backend_max_keepalive_connections: int = 20
+    backend_keepalive_expiry: float = 30.0
+    backend_timeout: float = 10.0
+    backend_connect_timeout: float = 5.0
+    backend_streaming: bool = False
+    backend_resilience: ResiliencePolicy = ResiliencePolicy()
+    validator_cache_size: int = 10000
+    validator_cache_ttl: float = 300.0
+    response_cache_enabled: bool = True
+    response_cache_local_size: int = 1000
+    response_cache_local_ttl: float = 5.0
+    response_cache_rules: dict[str, CacheRule] = {
+        "catalog": CacheRule(scope="permissions", ttl=30, stale_while_revalidate=60, stale_if_error=300),
+        "user_profile": CacheRule(scope="user", ttl=10, stale_while_revalidate=30, stale_if_error=300),
+    }
+    proxy_routes: dict[str, ProxyRoute] = {}
+    bootstrap_timeouts: dict[str, float] = {"user": 2.0, "catalog": 3.0}
+    metrics_enabled: bool = False
+    warm_up_timeout: float = 5.0
+    shutdown_timeout: float = 5.0
     environment: str = "development"
     cors_allow_origins: str
+
+    @property
+    def auth0_url(self) -> str:
+        return (self.auth0_base_url or f"https://{self.auth0_domain}").rstrip("/")
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    """Settings are parsed once per process. Use as a FastAPI dependency so tests can override them."""
+    return Settings()
+
+
+def reload_settings() -> Settings:
+    """Re-read the environment and `.env`. Values captured at startup (pools, keys) keep their old values."""
+    get_settings.cache_clear()
+    config = get_settings()
+    logging.info("Settings reloaded.")
+    return config
+
+
+def install_reload_handler() -> None:
+    """Reload settings on SIGHUP. Needs the main thread of a platform that has the signal."""
+    if not hasattr(signal, "SIGHUP"):
+        return
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+    except (RuntimeError, NotImplementedError) as e:
+        logging.info(f"Settings reload on SIGHUP is not available: {str(e)}")
@@ -3,10 +3,11 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import RedirectResponse, Response
 
-from app.core.security import get_current_user
+from app.core.session import get_session
 from app.models.auth import AuthStatusResponse, OtpResponse, SendOtpRequest, VerifyOtpRequest
+from app.models.settings import Settings, get_settings
 from app.services.authentication import BaseAuthenticationService, get_auth_service
-from app.services.tokens import TokenManager
+from app.services.tokens import get_token_manager
 
 router = APIRouter()
 
@@ -38,8 +39,7 @@ async def verify_otp(
     auth_service: BaseAuthenticationService = Depends(get_auth_service),
 ) -> OtpResponse:
     user_token = await auth_service.verify_otp(otp_request.email, otp_request.otp)
-    token_manager = TokenManager()
-    print(user_token)
+    token_manager = get_token_manager()
     await token_manager.create_session_token(user_token, response)
     model = OtpResponse(
         message="OTP verified successfully. You are now logged in.",
@@ -60,7 +60,7 @@ async def authenticate_user(
             del request.session["return_url"]
 
         user_token = await auth_service.callback(request)
-        token_manager = TokenManager()
+        token_manager = get_token_manager()
         response = RedirectResponse(url=return_url, status_code=status.HTTP_302_FOUND)
         await token_manager.create_session_token(user_token, response)
         return response
@@ -71,9 +71,41 @@ async def authenticate_user(
         )
 
 
-@router.post("/status")
-async def is_authenticated(request: Request, user_id: str = Depends(get_current_user)) -> AuthStatusResponse:
-    user_id = await get_current_user(request)
-    return AuthStatusResponse(
-        is_authenticated=user_id is not None,
-    )
+@router.get("/status")
+async def get_status(
+    request: Request,
+    response: Response,
+    config: Settings = Depends(get_settings),
+) -> AuthStatusResponse:
+    """Session status for polling clients. Never refreshes tokens; `expires_in` tells the client when to check
+    again, and the answer may be cached privately for up to `auth_status_max_age` seconds."""
+    session_status = await _get_session_status(request)
+    if session_status.is_authenticated:
+        max_age = min(session_status.expires_in, config.auth_status_max_age)
+        response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    response.headers["Vary"] = "Cookie"
+    return session_status
+
+
+@router.post("/status", deprecated=True)
+async def is_authenticated(request: Request) -> AuthStatusResponse:
+    """Previous form of `GET /status` that answers 401 for anonymous clients."""
+    session_status = await _get_session_status(request)
+    if not session_status.is_authenticated:
+        raise HTTPException(
+            status_code=401,
+            detail="User is not authenticated. Please log in.",
+        )
+    return session_status
+
+
+async def _get_session_status(request: Request) -> AuthStatusResponse:
+    try:
+        session = await get_session(request)
+    except HTTPException:
+        return AuthStatusResponse(is_authenticated=False)
+    if not session.is_active:
+        return AuthStatusResponse(is_authenticated=False)
+    return AuthStatusResponse(is_authenticated=True, expires_in=session.expires_in)
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable
+from typing import Annotated
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from app.core.session import get_session
+from app.models.bootstrap import BootstrapPart, BootstrapResponse
+from app.models.catalog import CatalogQuery
+from app.models.settings import Settings, get_settings
+from app.services.backend import BaseBackendService, get_backend_service
+
+router = APIRouter()
+
+
+@router.get("/")
+async def bootstrap(
+    request: Request,
+    catalog_query: Annotated[CatalogQuery, Query()],
+    backend: BaseBackendService = Depends(get_backend_service),
+    config: Settings = Depends(get_settings),
+) -> BootstrapResponse:
+    """Everything the SPA needs on page load in one round trip: the session is resolved once and the backend
+    calls run concurrently, each with its own timeout. A failed call is reported in its part of the response."""
+    try:
+        session = await get_session(request)
+        await session.get_user_id()
+    except HTTPException:
+        return BootstrapResponse(is_authenticated=False)
+
+    user, catalog = await asyncio.gather(
+        _run_part("user", backend.get_current_user(), config.bootstrap_timeouts.get("user")),
+        _run_part("catalog", backend.get_products(catalog_query), config.bootstrap_timeouts.get("catalog")),
+    )
+    return BootstrapResponse(is_authenticated=True, user=user, catalog=catalog)
+
+
+async def _run_part(name: str, call: Awaitable[Response], timeout: float | None) -> BootstrapPart:
+    try:
+        response = await asyncio.wait_for(call, timeout)
+        return BootstrapPart(ok=True, data=json.loads(response.body))
+    except TimeoutError:
+        error = f"Timed out after {timeout}s."
+    except httpx.HTTPStatusError as e:
+        error = f"Backend returned {e.response.status_code}."
+    except HTTPException as e:
+        error = str(e.detail)
+    except Exception as e:
+        error = "Backend unavailable."
+        logging.error(f"Bootstrap {name} failed: {str(e)}")
+    logging.warning(f"Bootstrap {name} failed: {error}")
+    return BootstrapPart(ok=False, error=error)
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
 
+from fastapi import APIRouter, Depends, Query
+
+from app.models.catalog import CatalogQuery
+from app.models.settings import Settings, get_settings
 from app.services.backend import BaseBackendService, get_backend_service
 
 router = APIRouter()
 
 
 @router.get("/")
-async def get_products(backend: BaseBackendService = Depends(get_backend_service)):
-    return await backend.get_products()
+async def get_products(
+    query: Annotated[CatalogQuery, Query()],
+    backend: BaseBackendService = Depends(get_backend_service),
+    config: Settings = Depends(get_settings),
+):
+    return await backend.get_products(query, stream=config.backend_streaming)
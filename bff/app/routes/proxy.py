@@ -0,0 +1,89 @@
+import logging
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from app.core.http_client import HOP_BY_HOP_HEADERS, SessionTokenAuth, get_http_client, relay_response
+from app.core.resilience import UpstreamUnavailable
+from app.core.session import get_session
+from app.models.proxy import ProxyRoute
+from app.models.settings import Settings, get_settings
+
+router = APIRouter()
+
+# Never forwarded: the BFF's own cookies, the client's credentials and what httpx sets for the backend itself
+EXCLUDED_REQUEST_HEADERS = HOP_BY_HOP_HEADERS | {b"host", b"cookie", b"authorization"}
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+def find_proxy_route(routes: dict[str, ProxyRoute], path: str) -> ProxyRoute | None:
+    """Longest whitelisted prefix that `path` is equal to or below."""
+    if any(segment in (".", "..") for segment in path.split("/")):
+        return None
+    for prefix in sorted(routes, key=len, reverse=True):
+        base = prefix.rstrip("/")
+        if path == base or path.startswith(f"{base}/"):
+            return routes[prefix]
+    return None
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"])
+async def proxy(
+    path: str,
+    request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    config: Settings = Depends(get_settings),
+) -> Response:
+    """Forward whitelisted backend paths with the session's access token, streaming both bodies."""
+    path = f"/{path}"
+    route = find_proxy_route(config.proxy_routes, path)
+    if route is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if request.method not in route.methods:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, detail="Method Not Allowed")
+
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > route.max_body_size:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body too large.")
+
+    # Resolve the session before reading the body, so unauthenticated requests are rejected without it
+    session = await get_session(request)
+    await session.get_access_token()
+
+    headers = [(name, value) for name, value in request.headers.raw if name not in EXCLUDED_REQUEST_HEADERS]
+    has_body = request.method not in ("GET", "HEAD") and (content_length or "transfer-encoding" in request.headers)
+    backend_request = client.build_request(
+        request.method,
+        httpx.URL(path, query=request.url.query.encode()),
+        headers=headers,
+        content=_limit_body(request, route.max_body_size) if has_body else None,
+        timeout=route.timeout,
+    )
+    try:
+        return await relay_response(client, backend_request, SessionTokenAuth(request))
+    except RequestBodyTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body too large.")
+    except UpstreamUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Backend temporarily unavailable.",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+    except httpx.TimeoutException:
+        logging.warning(f"Proxy timeout: {request.method} {path}")
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Backend timed out.")
+    except httpx.TransportError as e:
+        logging.error(f"Proxy error: {request.method} {path}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Backend unavailable.")
+
+
+async def _limit_body(request: Request, max_body_size: int):
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_body_size:
+            raise RequestBodyTooLarge()
+        yield chunk
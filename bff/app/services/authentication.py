@@ -1,14 +1,17 @@
 import logging
+import time
 from abc import ABC, abstractmethod
 from functools import lru_cache
 
 import httpx
-from authlib.integrations.requests_client import OAuth2Session
 from authlib.integrations.starlette_client import OAuth
 from fastapi import HTTPException, Request, status
 
+from app.core.metrics import timer
+from app.core.oidc import DISCOVERY_PATH, OidcMetadata
+from app.core.resilience import ResilientTransport, UpstreamUnavailable, get_upstream
 from app.models.auth import UserTokens
-from app.models.settings import Settings
+from app.models.settings import get_settings
 
 
 class BaseAuthenticationService(ABC):
@@ -37,16 +40,39 @@ class BaseAuthenticationService(ABC):
         """Handle the OAuth2 callback and return user information."""
         pass
 
+    @abstractmethod
+    async def refresh(self, refresh_token: str) -> UserTokens | None:
+        """Exchange a refresh token for new tokens. `refresh_token` is set when the IdP rotated it."""
+        pass
+
+    async def prewarm(self) -> None:
+        """Fetch what the first request would otherwise have to wait for."""
+        pass
+
+    async def aclose(self) -> None:
+        """Release network resources held by the service."""
+        pass
+
 
 class Auth0AuthenticationService(BaseAuthenticationService):
     def __init__(self):
         self.oauth = None
+        self.http_client: httpx.AsyncClient | None = None
+        config = get_settings()
+        # Shared by every flow; authlib is handed the same document instead of fetching its own
+        self.metadata = OidcMetadata(
+            config.auth0_url,
+            self._get_http_client,
+            ttl=config.oidc_metadata_ttl,
+            refresh_ahead=config.oidc_metadata_refresh_ahead,
+            retry_interval=config.oidc_metadata_retry_interval,
+        )
 
     def setup(self) -> None:
         if self.oauth is not None:
             return
 
-        config = Settings()
+        config = get_settings()
         self.oauth = OAuth()
         self.oauth.register(
             "auth0",
@@ -55,22 +81,51 @@ class Auth0AuthenticationService(BaseAuthenticationService):
             client_kwargs={
                 "scope": "openid profile email offline_access",
             },
-            server_metadata_url=f"https://{config.auth0_domain}/.well-known/openid-configuration",
+            server_metadata_url=f"{config.auth0_url}{DISCOVERY_PATH}",
         )
 
         logging.info("Auth0 OAuth client registered successfully.")
 
-    async def login(self, request: Request):
+    async def prewarm(self) -> None:
+        await self._load_server_metadata()
+        if self.metadata.fetch_count == 0:
+            raise RuntimeError("using default endpoints until the IdP is reachable")
+
+    async def aclose(self) -> None:
+        await self.metadata.aclose()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared async client for direct calls to the Auth0 API."""
+        if self.http_client is None:
+            config = get_settings()
+            transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=config.auth0_max_connections))
+            self.http_client = httpx.AsyncClient(
+                base_url=config.auth0_url,
+                transport=ResilientTransport(get_upstream("auth0", config.auth0_resilience), transport),
+                timeout=httpx.Timeout(config.auth0_timeout, connect=config.auth0_connect_timeout),
+            )
+        return self.http_client
+
+    async def _load_server_metadata(self):
         assert self.oauth is not None, "OAuth client is not initialized."
-        config = Settings()
+        server_metadata = self.oauth.auth0.server_metadata
+        server_metadata.update(await self.metadata.get())
+        # Marks the document as loaded, so authlib never runs its own discovery request
+        server_metadata.setdefault("_loaded_at", time.time())
+
+    async def login(self, request: Request):
+        await self._load_server_metadata()
+        config = get_settings()
         return await self.oauth.auth0.authorize_redirect(
             request, config.auth0_callback_url, audience=config.auth0_audience
         )
 
     async def send_otp(self, email: str):
         """Send OTP to the user's email."""
-        config = Settings()
-        start_otp_url = f"https://{config.auth0_domain}/passwordless/start"
+        config = get_settings()
         params = {
             "client_id": config.auth0_client_id,
             "client_secret": config.auth0_client_secret,
@@ -79,11 +134,13 @@ class Auth0AuthenticationService(BaseAuthenticationService):
             "send": "code",
         }
         try:
-            with httpx.Client() as client:
-                response = client.post(start_otp_url, json=params)
-                response.raise_for_status()
-                logging.info(f"OTP sent successfully to {email}.")
-                return response.json()
+            endpoint = await self.metadata.endpoint("passwordless_start_endpoint")
+            response = await self._get_http_client().post(endpoint, json=params)
+            response.raise_for_status()
+            logging.info(f"OTP sent successfully to {email}.")
+            return response.json()
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             logging.error(f"Error sending OTP: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -93,8 +150,7 @@ class Auth0AuthenticationService(BaseAuthenticationService):
 
     async def verify_otp(self, email: str, otp: str) -> UserTokens:
         """Verify the OTP for the user's email."""
-        config = Settings()
-        verify_otp_url = f"https://{config.auth0_domain}/oauth/token"
+        config = get_settings()
         params = {
             "grant_type": "http://auth0.com/oauth/grant-type/passwordless/otp",
             "client_id": config.auth0_client_id,
@@ -106,17 +162,19 @@ class Auth0AuthenticationService(BaseAuthenticationService):
             "scope": "openid profile email offline_access",
         }
         try:
-            with httpx.Client() as client:
-                response = client.post(verify_otp_url, json=params)
-                response.raise_for_status()
-                auth0_tokens = response.json()
-                user_tokens = UserTokens(
-                    access_token=auth0_tokens.get("access_token"),
-                    id_token=auth0_tokens.get("id_token"),
-                    refresh_token=auth0_tokens.get("refresh_token"),
-                )
-                logging.info(f"OTP verified successfully for {email}.")
-                return user_tokens
+            endpoint = await self.metadata.endpoint("token_endpoint")
+            response = await self._get_http_client().post(endpoint, json=params)
+            response.raise_for_status()
+            auth0_tokens = response.json()
+            user_tokens = UserTokens(
+                access_token=auth0_tokens.get("access_token"),
+                id_token=auth0_tokens.get("id_token"),
+                refresh_token=auth0_tokens.get("refresh_token"),
+            )
+            logging.info(f"OTP verified successfully for {email}.")
+            return user_tokens
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             DEFAULT_ERROR_MSG = "Error verifying phone number. Please try again later."
             if isinstance(e, httpx.HTTPStatusError):
@@ -139,7 +197,7 @@ class Auth0AuthenticationService(BaseAuthenticationService):
             )
 
     async def callback(self, request: Request) -> UserTokens:
-        assert self.oauth is not None, "OAuth client is not initialized."
+        await self._load_server_metadata()
         try:
             auth0_tokens = await self.oauth.auth0.authorize_access_token(request)
             user_tokens = UserTokens(
@@ -152,17 +210,27 @@ class Auth0AuthenticationService(BaseAuthenticationService):
             logging.error(f"Authentication error: {str(e)}", exc_info=True)
             raise
 
-    async def refresh(self, refresh_token: str) -> str | None:
-        assert self.oauth is not None, "OAuth client is not initialized."
+    async def refresh(self, refresh_token: str) -> UserTokens | None:
         try:
-            config = Settings()
-            session = OAuth2Session(config.auth0_client_id, client_secret=config.auth0_client_secret)
-            refresh_token_url = f"https://{config.auth0_domain}/oauth/token"
-            token = session.refresh_token(
-                refresh_token_url,
-                refresh_token=refresh_token,
+            config = get_settings()
+            params = {
+                "grant_type": "refresh_token",
+                "client_id": config.auth0_client_id,
+                "client_secret": config.auth0_client_secret,
+                "refresh_token": refresh_token,
+            }
+            endpoint = await self.metadata.endpoint("token_endpoint")
+            with timer("idp_refresh"):
+                response = await self._get_http_client().post(endpoint, data=params)
+            response.raise_for_status()
+            auth0_tokens = response.json()
+            return UserTokens(
+                access_token=auth0_tokens.get("access_token"),
+                id_token=auth0_tokens.get("id_token"),
+                refresh_token=auth0_tokens.get("refresh_token"),
             )
-            return token.get("access_token")
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             logging.error(f"Token refresh error: {str(e)}", exc_info=True)
             return None
@@ -1,46 +1,127 @@
+import hashlib
 from abc import ABC, abstractmethod
 
-from fastapi import Request
+import httpx
+from fastapi import Depends, Request, Response
 
-from app.core.http_client import SecureHttpClient
-from app.models.settings import Settings
-from app.services.tokens import TokenManager
+from app.core.conditional import CachedRepresentation, conditional_response, get_validator_cache, not_modified
+from app.core.http_client import SessionTokenAuth, get_http_client, relay_response
+from app.core.response_cache import get_response_cache
+from app.core.session import get_session
+from app.models.cache import CacheRule
+from app.models.catalog import CatalogQuery
+from app.models.settings import get_settings
 
 
 class BaseBackendService(ABC):
     @abstractmethod
-    async def get_products(self):
-        """Fetch products from the API."""
+    async def get_products(self, query: CatalogQuery, stream: bool = False) -> Response:
+        """Fetch one page of products from the API. With `stream` the body is relayed without buffering."""
         pass
 
     @abstractmethod
-    async def get_current_user(self):
+    async def get_current_user(self) -> Response:
         """Fetch user profile from the API."""
         pass
 
 
 class SampleBackendService(BaseBackendService):
-    def __init__(self, request: Request):
-        config = Settings()
-        self.base_url = config.backend_url.strip("/")
+    def __init__(self, request: Request, client: httpx.AsyncClient):
         self.request = request
-        self.token_manager = TokenManager()
-
-    async def get_products(self):
-        async with SecureHttpClient(self.request) as client:
-            endpoint = f"{self.base_url}/catalog"
-            response = await client.get(endpoint, follow_redirects=True)
-            response.raise_for_status()
-            return response.json()
-
-    async def get_current_user(self):
-        async with SecureHttpClient(self.request) as client:
-            user_id = await self.token_manager.get_user_id(self.request)
-            endpoint = f"{self.base_url}/users/{user_id}"
-            response = await client.get(endpoint, follow_redirects=True)
-            response.raise_for_status()
-            return response.json()
-
-
-def get_backend_service(request: Request) -> BaseBackendService:
-    return SampleBackendService(request)
+        self.client = client
+        self.auth = SessionTokenAuth(request)
+
+    async def get_products(self, query: CatalogQuery, stream: bool = False) -> Response:
+        params = query.model_dump(exclude_none=True)
+        if stream:
+            return await self._stream("/catalog/", params)
+        return await self._get("catalog", "/catalog/", params)
+
+    async def get_current_user(self) -> Response:
+        session = await get_session(self.request)
+        user_id = await session.get_user_id()
+        return await self._get("user_profile", f"/users/{user_id}")
+
+    async def _get(self, rule_name: str, path: str, params: dict | None = None) -> Response:
+        """GET through the shared response cache if `rule_name` has a cache rule, otherwise revalidate directly."""
+        config = get_settings()
+        rule = config.response_cache_rules.get(rule_name) if config.response_cache_enabled else None
+        if rule is None:
+            return await self._get_conditional(path, params)
+
+        scope = await self._get_scope_key(rule)
+        key = f"{rule_name}:{scope}:{path}?{httpx.QueryParams(sorted((params or {}).items()))}"
+        representation = await get_response_cache().get(key, rule, lambda cached: self._fetch(path, params, cached))
+        return conditional_response(self.request, representation)
+
+    async def _stream(self, path: str, params: dict | None = None) -> Response:
+        """Relay a backend GET without buffering it. The body bypasses the response cache and is passed on in the
+        encoding the client accepts, so the BFF never decodes it."""
+        headers = {"Accept-Encoding": self.request.headers.get("accept-encoding", "identity")}
+        if "if-none-match" in self.request.headers:
+            headers["If-None-Match"] = self.request.headers["if-none-match"]
+        request = self.client.build_request("GET", path, params=params, headers=headers)
+        return await relay_response(self.client, request, self.auth)
+
+    async def _get_scope_key(self, rule: CacheRule) -> str:
+        # Resolving the session first means cached entries are only ever served to a valid session
+        session = await get_session(self.request)
+        if rule.scope == "user":
+            value = await session.get_user_id()
+        elif rule.scope == "permissions":
+            value = " ".join(sorted(await session.get_permissions()))
+        else:
+            await session.get_access_token()
+            return "global"
+        return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+    async def _fetch(self, path: str, params: dict | None, cached: CachedRepresentation | None) -> CachedRepresentation:
+        headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else {}
+        response = await self.client.get(path, params=params, headers=headers, auth=self.auth, follow_redirects=True)
+        if response.status_code == httpx.codes.NOT_MODIFIED and cached is not None:
+            return cached
+        response.raise_for_status()
+        return CachedRepresentation(
+            etag=response.headers.get("etag"),
+            content=response.content,
+            media_type=response.headers.get("content-type", "application/json"),
+        )
+
+    async def _get_conditional(self, path: str, params: dict | None = None) -> Response:
+        """GET from the backend, revalidating this user's cached copy instead of downloading it again."""
+        session = await get_session(self.request)
+        user_id = await session.get_user_id()
+        key = f"{user_id}:{path}?{httpx.QueryParams(sorted((params or {}).items()))}"
+        validators = get_validator_cache()
+        cached = validators.get(key)
+
+        headers = {}
+        if cached is not None:
+            headers["If-None-Match"] = cached.etag
+        elif "if-none-match" in self.request.headers:
+            # Nothing cached here, but the client's own copy can still be validated by the backend
+            headers["If-None-Match"] = self.request.headers["if-none-match"]
+
+        response = await self.client.get(path, params=params, headers=headers, auth=self.auth, follow_redirects=True)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            if cached is None:
+                return not_modified(response.headers.get("etag", headers["If-None-Match"]))
+            validators.set(key, cached)
+            return conditional_response(self.request, cached)
+
+        response.raise_for_status()
+        etag = response.headers.get("etag")
+        if not etag:
+            return Response(content=response.content, media_type=response.headers.get("content-type"))
+
+        representation = CachedRepresentation(
+            etag=etag,
+            content=response.content,
+            media_type=response.headers.get("content-type", "application/json"),
+        )
+        validators.set(key, representation)
+        return conditional_response(self.request, representation)
+
+
+def get_backend_service(request: Request, client: httpx.AsyncClient = Depends(get_http_client)) -> BaseBackendService:
+    return SampleBackendService(request, client)
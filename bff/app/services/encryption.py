@@ -1,32 +1,89 @@
 import base64
 import os
+from functools import lru_cache
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from app.core.metrics import timer
+from app.models.settings import get_settings
+
+KDF_ITERATIONS = 100000
+VERSION_SEPARATOR = ":"
+
+
+def derive_key(password: str, salt: str | bytes) -> bytes:
+    salt = bytes.fromhex(salt) if isinstance(salt, str) else salt
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=KDF_ITERATIONS,
+    )
+    return kdf.derive(password.encode())
+
 
 class EncryptionService:
-    def __init__(self, password: str, salt: str | bytes):
-        self.password = password.encode()
-        self.salt = bytes.fromhex(salt) if isinstance(salt, str) else salt
-        self.kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=self.salt,
-            iterations=100000,
-        )
-        self.key = self.kdf.derive(self.password)
+    """AES-GCM keyring. Keys are derived once and every ciphertext is tagged with the key version."""
+
+    def __init__(self, password: str, salt: str | bytes, version: int = 1, previous_keys: dict[int, str] | None = None):
+        self.version = version
+        self.keys = {version: AESGCM(derive_key(password, salt))}
+        for previous_version, previous_password in (previous_keys or {}).items():
+            if previous_version != version:
+                self.keys[previous_version] = AESGCM(derive_key(previous_password, salt))
 
     def encrypt(self, data: str) -> str:
-        aesgcm = AESGCM(self.key)
         nonce = os.urandom(12)
-        encrypted_data = aesgcm.encrypt(nonce, data.encode(), None)
-        return base64.b64encode(nonce + encrypted_data).decode()
+        with timer("aes_gcm_encrypt"):
+            encrypted_data = self.keys[self.version].encrypt(nonce, data.encode(), None)
+        return f"{self.version}{VERSION_SEPARATOR}{base64.b64encode(nonce + encrypted_data).decode()}"
 
     def decrypt(self, encrypted_data: str) -> str:
+        version, separator, payload = encrypted_data.partition(VERSION_SEPARATOR)
+        if not separator:
+            # Values written before key versioning carry no prefix, try every key in the ring.
+            return self._decrypt_untagged(encrypted_data)
+
+        aesgcm = self.keys.get(int(version))
+        if aesgcm is None:
+            raise ValueError(f"Unknown encryption key version: {version}")
+        return self._decrypt_with(aesgcm, payload)
+
+    def _decrypt_untagged(self, encrypted_data: str) -> str:
+        error = None
+        for aesgcm in self.keys.values():
+            try:
+                return self._decrypt_with(aesgcm, encrypted_data)
+            except Exception as e:
+                error = e
+        raise ValueError(f"Unable to decrypt data: {error}")
+
+    @staticmethod
+    def _decrypt_with(aesgcm: AESGCM, encrypted_data: str) -> str:
         encrypted_data_bytes = base64.b64decode(encrypted_data.encode())
         nonce = encrypted_data_bytes[:12]
         ciphertext = encrypted_data_bytes[12:]
-        aesgcm = AESGCM(self.key)
-        return aesgcm.decrypt(nonce, ciphertext, None).decode()
+        with timer("aes_gcm_decrypt"):
+            return aesgcm.decrypt(nonce, ciphertext, None).decode()
+
+
+def parse_previous_keys(value: str) -> dict[int, str]:
+    """Parse `version:secret` pairs separated by commas."""
+    keys = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        version, _, secret = item.partition(":")
+        keys[int(version)] = secret
+    return keys
+
+
+@lru_cache()
+def get_encryption_service() -> EncryptionService:
+    config = get_settings()
+    return EncryptionService(
+        config.app_secret_key,
+        config.app_secret_salt,
+        version=config.app_secret_key_version,
+        previous_keys=parse_previous_keys(config.app_previous_secret_keys),
+    )
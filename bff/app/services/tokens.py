@@ -1,32 +1,95 @@
+import asyncio
+import base64
+import json
 import logging
 import secrets
+import time
+from functools import lru_cache
 
-import jwt
-from fastapi import HTTPException, Request, Response
+from fastapi import HTTPException, Response
 
-from app.core.cache import get_cache
+from app.core.cache import LocalCache, cache_stats, get_cache
+from app.core.metrics import timer
 from app.models.auth import UserTokens
-from app.models.settings import Settings
+from app.models.settings import get_settings
 from app.services.authentication import get_auth_service
-from app.services.encryption import EncryptionService
+from app.services.encryption import get_encryption_service
+
+# In-flight refreshes per session id, shared by every request handled by this worker
+_refreshes: dict[str, asyncio.Task] = {}
+
+LEGACY_FIELDS = ("user_id", "access_token", "refresh_token")
+INVALIDATION_CHANNEL = "session-invalidations"
+# The only claims the BFF reads, kept with the session so the JWT is parsed once per token
+SESSION_CLAIMS = ("sub", "scope", "permissions")
+# Cookie storage splits the sealed session over `session_token.0`, `session_token.1`, ... to stay under the
+# browsers' 4 KB limit per cookie
+SESSION_COOKIE = "session_token"
+SESSION_COOKIE_CHUNK_SIZE = 3800
+SESSION_COOKIE_MAX_CHUNKS = 4
+
+
+def read_claims(access_token: str) -> dict:
+    """Read the payload of a JWT without verifying it; the backend verifies every token it receives.
+
+    Fails fast on anything that is not a three-part token with integer `exp` and a `sub`.
+    """
+    parts = access_token.split(".")
+    if len(parts) != 3:
+        raise ValueError("Access token is not a JWT.")
+    payload = parts[1]
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    if not isinstance(claims, dict) or not claims.get("sub") or not isinstance(claims.get("exp"), int):
+        raise ValueError("Access token does not contain required fields.")
+    return claims
+
+
+class SessionRecord(dict[str, str]):
+    """Raw session hash plus the values decrypted from it so far."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.decrypted: dict[str, str] = {}
+        self.claims: dict | None = None
+        # Set for records read from a session cookie, whose refresh token stays in Redis
+        self.refreshable: bool | None = None
 
 
 class TokenManager:
+    """Session tokens stored in one Redis hash per session: `session:{id}` -> claims (compact JSON of
+    `SESSION_CLAIMS`), access_token, refresh_token (encrypted) and exp (plain, so expiry checks need no
+    decryption).
+
+    With `session_storage = "cookie"` the session id, exp, claims and access token are sealed into the session
+    cookie instead and the hash starts out with only the refresh token. Refreshes still go through the hash, so
+    concurrent requests carrying the old cookie share one refresh.
+    """
+
     def __init__(self):
         self.cache = get_cache()
-        config = Settings()
-        self.crypto = EncryptionService(config.app_secret_key, config.app_secret_salt)
-        self.config = config
+        self.crypto = get_encryption_service()
+        self.local_cache: LocalCache | None = None
+        self.instance_id = secrets.token_hex(8)
+        config = get_settings()
+        self.cookie_storage = config.session_storage == "cookie"
+        # Sessions whose early refresh failed are left to the synchronous refresh at expiry
+        self.failed_early_refreshes = LocalCache(config.session_cache_size, config.refresh_ahead_window)
+        # Cookie storage: sessions refreshed early, handed to the next request that still carries the old cookie
+        self.early_refreshed = LocalCache(config.session_cache_size, config.refresh_ahead_window)
+        if config.session_cache_enabled:
+            self.local_cache = LocalCache(config.session_cache_size, config.session_cache_ttl)
 
     async def create_session_token(self, token: UserTokens, resposne: Response):
         if not token.access_token:
             raise ValueError("Access token is required to create a session token.")
 
         session_id = secrets.token_urlsafe(32)
-        await self._update_user_id_and_exp_from_token(session_id, token.access_token)
-        refresh_token_key = f"refresh_token:{session_id}"
-        refresh_token = self.crypto.encrypt(token.refresh_token)
-        await self.cache.set(refresh_token_key, refresh_token)
+        if self.cookie_storage:
+            session = await self._store_refresh_token(session_id, token.access_token, token.refresh_token)
+            self.set_session_cookie(resposne, session_id, session)
+            return
+
+        await self._store_tokens(session_id, token.access_token, token.refresh_token)
         # samesite = "Lax"
         samesite = "None"  # Use None to allow cross-site cookies
         resposne.set_cookie(
@@ -37,81 +100,330 @@ class TokenManager:
             samesite=samesite,
         )
 
-    async def refresh(self, request: Request):
-        session_id = request.cookies.get("session_id")
-        if not session_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Session ID cookie not found. Please log in again.",
-            )
+    async def refresh(self, session_id: str, rejected_token: str | None = None) -> SessionRecord:
+        """Refresh the session's access token, sharing one refresh between all concurrent callers.
 
-        refresh_token = await self._get_refresh_token(session_id)
-        auth_client = get_auth_service()
-        access_token = await auth_client.refresh(refresh_token)
-        await self._update_user_id_and_exp_from_token(session_id, access_token)
-        return access_token
+        `rejected_token` is the token the caller saw fail; any other cached token counts as already refreshed.
+        Returns the updated session record.
+        """
+        return await asyncio.shield(self._start_refresh(session_id, rejected_token))
 
-    async def get_access_token(self, request: Request) -> str:
-        session_id = request.cookies.get("session_id")
-        if not session_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Session ID cookie not found. Please log in again.",
-            )
+    def refresh_in_background(self, session_id: str, session: SessionRecord) -> asyncio.Task | None:
+        """Refresh a session whose token is about to expire without making the current request wait for it.
 
-        access_token_key = f"access_token:{session_id}"
-        access_token = await self.cache.get(access_token_key)
-        if access_token:
-            access_token = self.crypto.decrypt(access_token)
-            return access_token
+        Returns the refresh, or None when an earlier early refresh of this session failed.
+        """
+        if self.failed_early_refreshes.get(session_id):
+            return None
+        task = _refreshes.get(session_id)
+        if task is None:
+            task = self._start_refresh(session_id, self.decrypt_field(session, "access_token"))
+            task.add_done_callback(lambda _: self._on_background_refresh_done(session_id, task))
+        return task
 
-        access_token = await self.refresh(request)
-        return access_token
+    def needs_early_refresh(self, session: dict[str, str]) -> bool:
+        return int(session.get("exp") or 0) - time.time() <= get_settings().refresh_ahead_window
 
-    async def get_user_id(self, request: Request) -> str:
-        session_id = request.cookies.get("session_id")
-        if not session_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Session ID cookie not found. Please log in again.",
-            )
+    def _start_refresh(self, session_id: str, rejected_token: str | None) -> asyncio.Task:
+        task = _refreshes.get(session_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh_session(session_id, rejected_token))
+            _refreshes[session_id] = task
+            task.add_done_callback(lambda _: _refreshes.pop(session_id, None))
+        return task
+
+    def get_early_refreshed(self, session_id: str, session: SessionRecord) -> SessionRecord | None:
+        refreshed = self.early_refreshed.get(session_id)
+        if refreshed is None or int(refreshed.get("exp") or 0) <= int(session.get("exp") or 0):
+            return None
+        return refreshed
+
+    def _on_background_refresh_done(self, session_id: str, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            if self.cookie_storage:
+                self.early_refreshed.set(session_id, task.result())
+            return
+        error = task.exception()
+        self.failed_early_refreshes.set(session_id, True)
+        logging.warning(f"Background token refresh failed: {getattr(error, 'detail', None) or str(error)}")
+
+    async def load_session(self, session_id: str, use_local_cache: bool = True) -> SessionRecord:
+        if use_local_cache and self.local_cache is not None:
+            session = self.local_cache.get(session_id)
+            if session is not None:
+                return session
+
+        with timer("redis"):
+            session = await self.cache.hgetall(f"session:{session_id}")
+        cache_stats.record()
+        if session:
+            session = SessionRecord(session)
+        else:
+            session = await self._migrate_legacy_session(session_id)
+        self._cache_locally(session_id, session)
+        return session
+
+    def decrypt_field(self, session: SessionRecord, name: str) -> str | None:
+        if name not in session.decrypted:
+            value = session.get(name)
+            if not value:
+                return None
+            session.decrypted[name] = self.crypto.decrypt(value)
+        return session.decrypted[name]
+
+    def get_claims(self, session: SessionRecord) -> dict:
+        """The session's claims, decrypted once per record. Sessions written before claims were stored only
+        have `user_id`, so their claims are read from the access token once."""
+        if session.claims is None:
+            claims = self.decrypt_field(session, "claims")
+            if claims:
+                session.claims = json.loads(claims)
+            elif session.get("access_token"):
+                session.claims = self._compact_claims(read_claims(self.decrypt_field(session, "access_token")))
+            else:
+                session.claims = {"sub": self.decrypt_field(session, "user_id")}
+        return session.claims
+
+    def get_access_token(self, session: SessionRecord) -> str | None:
+        if self.is_expired(session):
+            return None
+        return self.decrypt_field(session, "access_token")
+
+    def can_refresh(self, session: SessionRecord) -> bool:
+        if session.refreshable is not None:
+            return session.refreshable
+        return bool(session.get("refresh_token"))
 
-        user_id_key = f"user_id:{session_id}"
-        user_id = await self.cache.get(user_id_key)
-        if user_id:
-            user_id = self.crypto.decrypt(user_id)
-            return user_id
+    def read_session_cookie(self, cookies: dict[str, str]) -> tuple[str, SessionRecord] | None:
+        """Unseal a session written by `set_session_cookie`. Returns the session id and record, or None when
+        there is no readable session cookie."""
+        chunks = []
+        for index in range(SESSION_COOKIE_MAX_CHUNKS):
+            chunk = cookies.get(f"{SESSION_COOKIE}.{index}")
+            if not chunk:
+                break
+            chunks.append(chunk)
+        if not chunks:
+            return None
 
-        await self.refresh(request)
-        user_id = await self.cache.get(user_id_key)
-        user_id = self.crypto.decrypt(user_id)
-        return user_id
+        try:
+            payload = json.loads(self.crypto.decrypt("".join(chunks)))
+            session = SessionRecord(exp=str(payload["exp"]))
+            session.decrypted["access_token"] = payload["access_token"]
+            session.claims = payload["claims"]
+            session.refreshable = payload["refreshable"]
+            return payload["sid"], session
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable session cookie: {e!r}")
+            return None
+
+    def set_session_cookie(self, response: Response, session_id: str, session: SessionRecord):
+        """Seal the session into the session cookies, clearing chunks left over from a larger session."""
+        payload = {
+            "sid": session_id,
+            "exp": int(session.get("exp") or 0),
+            "claims": self.get_claims(session),
+            "access_token": self.decrypt_field(session, "access_token"),
+            "refreshable": self.can_refresh(session),
+        }
+        sealed = self.crypto.encrypt(json.dumps(payload, separators=(",", ":")))
+        chunks = [sealed[i : i + SESSION_COOKIE_CHUNK_SIZE] for i in range(0, len(sealed), SESSION_COOKIE_CHUNK_SIZE)]
+        if len(chunks) > SESSION_COOKIE_MAX_CHUNKS:
+            raise ValueError("Session is too large for cookie storage.")
+
+        for index in range(SESSION_COOKIE_MAX_CHUNKS):
+            name = f"{SESSION_COOKIE}.{index}"
+            if index < len(chunks):
+                response.set_cookie(name, chunks[index], httponly=True, secure=True, samesite="None")
+            else:
+                response.delete_cookie(name, httponly=True, secure=True, samesite="None")
+
+    async def listen_for_invalidations(self):
+        """Drop locally cached sessions that another worker has refreshed. Runs for the life of the app."""
+        if self.local_cache is None:
+            return
+
+        while True:
+            pubsub = self.cache.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while we were not subscribed is lost, so start from a clean cache.
+                self.local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    instance_id, _, session_id = message["data"].partition(":")
+                    if instance_id != self.instance_id:
+                        self.local_cache.delete(session_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Session invalidation listener failed: {str(e)}")
+                self.local_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def _cache_locally(self, session_id: str, session: SessionRecord):
+        if self.local_cache is None:
+            return
+        ttl = int(session.get("exp") or 0) - time.time()
+        self.local_cache.set(session_id, session, ttl=ttl)
+
+    async def _invalidate(self, session_id: str, session: SessionRecord):
+        self._cache_locally(session_id, session)
+        if self.local_cache is not None:
+            with timer("redis"):
+                await self.cache.publish(INVALIDATION_CHANNEL, f"{self.instance_id}:{session_id}")
+            cache_stats.record()
+
+    @staticmethod
+    def is_expired(session: dict[str, str]) -> bool:
+        return int(session.get("exp") or 0) <= time.time()
+
+    async def _refresh_session(self, session_id: str, rejected_token: str | None) -> SessionRecord:
+        # The Redis lock makes sure only one worker talks to Auth0, the others wait for its result.
+        config = get_settings()
+        lock = self.cache.lock(
+            f"refresh_lock:{session_id}",
+            timeout=config.refresh_lock_timeout,
+            blocking=False,
+            thread_local=False,
+            raise_on_release_error=False,
+        )
+        deadline = time.monotonic() + config.refresh_lock_timeout
+        while not await lock.acquire():
+            cache_stats.record()
+            await asyncio.sleep(config.refresh_poll_interval)
+            session = await self.load_session(session_id, use_local_cache=False)
+            access_token = self.get_access_token(session)
+            if access_token and access_token != rejected_token:
+                return session
+            if time.monotonic() > deadline:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Timed out waiting for the session to be refreshed.",
+                )
+        cache_stats.record()
+
+        try:
+            session = await self.load_session(session_id, use_local_cache=False)
+            access_token = self.get_access_token(session)
+            if access_token and access_token != rejected_token:
+                return session
+
+            refresh_token = self._get_refresh_token(session)
+            auth_client = get_auth_service()
+            tokens = await auth_client.refresh(refresh_token)
+            if not tokens or not tokens.access_token:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Unable to refresh the session. Please log in again.",
+                )
+            # With refresh token rotation the old one is revoked, keep the one that came with the new access token
+            updated = await self._store_tokens(session_id, tokens.access_token, tokens.refresh_token)
+            session = SessionRecord(session, **updated)
+            session.pop("user_id", None)
+            await self._invalidate(session_id, session)
+            return session
+        finally:
+            await lock.release()
+            cache_stats.record()
 
-    async def _get_refresh_token(self, session_id: str) -> str:
-        refresh_token_key = f"refresh_token:{session_id}"
-        refresh_token = await self.cache.get(refresh_token_key)
+    def _get_refresh_token(self, session: SessionRecord) -> str:
+        refresh_token = self.decrypt_field(session, "refresh_token")
         if not refresh_token:
             raise HTTPException(
                 status_code=401,
                 detail="Refresh token not found. Please log in again.",
             )
-        return self.crypto.decrypt(refresh_token)
+        return refresh_token
 
-    async def _update_user_id_and_exp_from_token(self, session_id: str, access_token: str):
+    async def _migrate_legacy_session(self, session_id: str) -> SessionRecord:
+        """Move a session stored as separate `user_id:`/`access_token:`/`refresh_token:` keys into the hash."""
+        legacy_keys = [f"{field}:{session_id}" for field in LEGACY_FIELDS]
+        with timer("redis"):
+            values = await self.cache.mget(legacy_keys)
+        cache_stats.record()
+        session = SessionRecord({field: value for field, value in zip(LEGACY_FIELDS, values) if value})
+        if not session.get("refresh_token"):
+            return SessionRecord()
+
+        session["exp"] = "0"
+        if session.get("access_token") and session.get("user_id"):
+            try:
+                access_token = self.decrypt_field(session, "access_token")
+                session["exp"] = str(read_claims(access_token)["exp"])
+            except Exception as e:
+                logging.warning(f"Unable to read expiry from legacy access token: {str(e)}")
+
+        async with self.cache.pipeline(transaction=True) as pipe:
+            pipe.hset(f"session:{session_id}", mapping=session)
+            pipe.delete(*legacy_keys)
+            with timer("redis"):
+                await pipe.execute()
+        cache_stats.record(commands=2)
+        logging.info("Migrated legacy session keys into a session hash.")
+        return session
+
+    async def _store_tokens(
+        self, session_id: str, access_token: str, refresh_token: str | None = None
+    ) -> dict[str, str]:
+        try:
+            claims = read_claims(access_token)
+            session = {
+                "claims": self.crypto.encrypt(json.dumps(self._compact_claims(claims), separators=(",", ":"))),
+                "access_token": self.crypto.encrypt(access_token),
+                "exp": str(claims["exp"]),
+            }
+            if refresh_token:
+                session["refresh_token"] = self.crypto.encrypt(refresh_token)
+
+            async with self.cache.pipeline(transaction=True) as pipe:
+                pipe.hset(f"session:{session_id}", mapping=session)
+                pipe.hdel(f"session:{session_id}", "user_id")
+                with timer("redis"):
+                    await pipe.execute()
+            cache_stats.record(commands=2)
+            return session
+        except Exception as e:
+            logging.error(f"Error storing session tokens: {str(e)}")
+            raise ValueError(f"Invalid access token: {str(e)}")
+
+    async def _store_refresh_token(
+        self, session_id: str, access_token: str, refresh_token: str | None
+    ) -> SessionRecord:
+        """Cookie storage: keep only the refresh token in Redis and return the record to seal into the cookie."""
         try:
-            decoded_token = jwt.decode(access_token, options={"verify_signature": False})
-            user_id = decoded_token.get("sub")
-            exp = decoded_token.get("exp")
-            if not user_id or not exp:
-                raise ValueError("Access token does not contain required fields.")
-
-            user_id_key = f"user_id:{session_id}"
-            user_id = self.crypto.encrypt(user_id)
-            await self.cache.set(user_id_key, user_id, exat=exp)
-
-            access_token_key = f"access_token:{session_id}"
-            access_token = self.crypto.encrypt(access_token)
-            await self.cache.set(access_token_key, access_token, exat=exp)
+            claims = read_claims(access_token)
         except Exception as e:
-            logging.error(f"Error updating user ID and expiration from token: {str(e)}")
+            logging.error(f"Error storing session tokens: {str(e)}")
             raise ValueError(f"Invalid access token: {str(e)}")
+
+        if refresh_token:
+            with timer("redis"):
+                await self.cache.hset(f"session:{session_id}", "refresh_token", self.crypto.encrypt(refresh_token))
+            cache_stats.record()
+        session = SessionRecord(exp=str(claims["exp"]))
+        session.decrypted["access_token"] = access_token
+        session.claims = self._compact_claims(claims)
+        session.refreshable = bool(refresh_token)
+        return session
+
+    @staticmethod
+    def _compact_claims(claims: dict) -> dict:
+        return {name: claims[name] for name in SESSION_CLAIMS if claims.get(name)}
+
+
+async def wait_for_refreshes(timeout: float):
+    """Give in-flight refreshes a chance to finish at shutdown. A cancelled refresh would keep its Redis lock
+    until it times out and make other workers wait for it."""
+    if _refreshes:
+        await asyncio.wait(list(_refreshes.values()), timeout=timeout)
+
+
+@lru_cache()
+def get_token_manager() -> TokenManager:
+    return TokenManager()
@@ -0,0 +1,75 @@
+import os
+import socket
+import threading
+import time
+
+import uvicorn
+
+try:
+    import fakeredis
+except ImportError:  # Optional: benchmarks fall back to a real Redis given with --redis-url
+    fakeredis = None
+
+DEFAULT_ENV = {
+    "AUTH0_CLIENT_ID": "benchmark-client",
+    "AUTH0_CLIENT_SECRET": "benchmark-secret",
+    "AUTH0_DOMAIN": "auth0.invalid",
+    "AUTH0_AUDIENCE": "https://api.invalid",
+    "AUTH0_CALLBACK_URL": "http://127.0.0.1/auth/callback",
+    "APP_SECRET_KEY": "benchmark-app-secret",
+    "APP_SECRET_SALT": "00112233445566778899aabbccddeeff",
+    "REDIS_URL": "redis://127.0.0.1:6379/0",
+    "BACKEND_URL": "http://127.0.0.1:8000",
+    "CORS_ALLOW_ORIGINS": "http://127.0.0.1",
+}
+
+
+def configure_environment(**overrides: str) -> None:
+    """Fill in the settings the app requires so benchmarks run without a .env file."""
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(overrides)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """Run an ASGI app on its own event loop so it does not share the loop being measured."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def start_fake_redis() -> str:
+    """Serve an in-memory Redis on localhost and return its URL. Much slower than a real Redis, so only use it
+    for relative numbers. It cannot run the Lua scripts behind Redis locks, so token refreshes need a real Redis."""
+    if fakeredis is None:
+        raise SystemExit("fakeredis is not installed, pass --redis-url to use a running Redis.")
+    port = free_port()
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def cpu_seconds(pid: int) -> float | None:
+    """User plus system CPU time of another process, on platforms with /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rpartition(")")[2].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
@@ -0,0 +1,109 @@
+"""Bulkhead, circuit breaker and retry behaviour of the backend client against a fault-injecting stub.
+
+Each scenario reconfigures a local stub server (latency and failure rate) and drives the same client the
+BFF uses for backend calls, then reports outcomes, latency and the state of the upstream's guards.
+
+    uv run python -m benchmarks.fault_injection
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks._support import configure_environment, free_port, percentile, serve_in_thread
+
+fault = {"latency": 0.0, "failure_rate": 0.0, "status": 503}
+
+
+async def stub_endpoint(request):
+    if fault["latency"]:
+        await asyncio.sleep(fault["latency"])
+    if random.random() < fault["failure_rate"]:
+        return JSONResponse({"detail": "injected failure"}, status_code=fault["status"])
+    return JSONResponse({"ok": True})
+
+
+async def run_scenario(client, upstream, name: str, requests: int, concurrency: int, **faults):
+    fault.update({"latency": 0.0, "failure_rate": 0.0, "status": 503}, **faults)
+    retries_before = upstream.retries
+    outcomes = Counter()
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/stub")
+                outcomes[str(response.status_code)] += 1
+            except Exception as e:
+                outcomes[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    print(f"{name}")
+    print(f"  outcomes: {dict(outcomes)}")
+    print(
+        f"  latency p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+        f"retries {upstream.retries - retries_before}"
+    )
+    print(
+        f"  breaker {upstream.breaker.state} (opened {upstream.breaker.times_opened}x), "
+        f"bulkhead rejected {upstream.bulkhead.rejected}, retry budget exhausted {upstream.budget.exhausted}x"
+    )
+
+
+async def run(args):
+    port = free_port()
+    serve_in_thread(Starlette(routes=[Route("/stub", stub_endpoint)]), port)
+    configure_environment(
+        BACKEND_URL=f"http://127.0.0.1:{port}",
+        BACKEND_RESILIENCE=(
+            f'{{"max_concurrency": {args.max_concurrency}, "queue_timeout": 0.2, "failure_threshold": 5, '
+            f'"recovery_timeout": {args.recovery_timeout}, "retries": 2, "retry_backoff": 0.02}}'
+        ),
+    )
+    from app.core.http_client import create_http_client
+    from app.core.resilience import upstreams
+    from app.models.settings import get_settings
+
+    client = create_http_client(get_settings())
+    upstream = upstreams["backend"]
+    try:
+        await run_scenario(client, upstream, "healthy", args.requests, args.concurrency)
+        await run_scenario(client, upstream, "flaky (20% 503)", args.requests, args.concurrency, failure_rate=0.2)
+        await run_scenario(
+            client, upstream, "down (100% 500)", args.requests, args.concurrency, failure_rate=1.0, status=500
+        )
+        await asyncio.sleep(args.recovery_timeout)
+        await run_scenario(client, upstream, "half-open probe", 1, 1)
+        await run_scenario(client, upstream, "recovered", args.requests, args.concurrency)
+        await run_scenario(
+            client,
+            upstream,
+            "slow (2 s) beyond the bulkhead",
+            args.max_concurrency * 4,
+            args.max_concurrency * 4,
+            latency=2.0,
+        )
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--max-concurrency", type=int, default=20)
+    parser.add_argument("--recovery-timeout", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Per-call cost of the BFF's session hot paths: AES-GCM in `EncryptionService` and the `TokenManager`
+operations every authenticated request goes through.
+
+Session reads and writes go to an in-process fake Redis unless `--redis-url` is given, in which case
+the numbers include the network round trip.
+
+    uv run python -m benchmarks.hot_paths --iterations 20000
+    uv run python -m benchmarks.hot_paths --redis-url redis://127.0.0.1:6379/15
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import secrets
+import time
+import timeit
+
+from benchmarks._support import configure_environment, fakeredis
+
+
+def make_access_token(sub: str, lifetime: int = 3600) -> str:
+    """An unsigned token of realistic size; the BFF never verifies signatures."""
+
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+
+    now = int(time.time())
+    claims = {
+        "iss": "https://auth0.invalid/",
+        "sub": sub,
+        "aud": ["https://api.invalid", "https://auth0.invalid/userinfo"],
+        "iat": now,
+        "exp": now + lifetime,
+        "scope": "openid profile email offline_access",
+        "azp": "benchmark-client",
+        "permissions": ["read:products", "read:user", "write:orders", "read:orders"],
+    }
+    signature = base64.urlsafe_b64encode(secrets.token_bytes(256)).rstrip(b"=").decode()
+    return f"{encode({'alg': 'RS256', 'typ': 'JWT', 'kid': 'benchmark'})}.{encode(claims)}.{signature}"
+
+
+def report(name: str, seconds: float):
+    print(f"  {name:<44} {seconds * 1e6:9.2f} us/op")
+
+
+def bench_encryption(iterations: int):
+    from app.services.encryption import get_encryption_service
+
+    crypto = get_encryption_service()
+    print("EncryptionService")
+    for label, value in (
+        ("claims", '{"sub":"auth0|0123456789abcdef01234567"}'),
+        ("access token", make_access_token("u")),
+    ):
+        encrypted = crypto.encrypt(value)
+        report(
+            f"encrypt {label} ({len(value)} B)",
+            timeit.timeit(lambda: crypto.encrypt(value), number=iterations) / iterations,
+        )
+        report(
+            f"decrypt {label} ({len(value)} B)",
+            timeit.timeit(lambda: crypto.decrypt(encrypted), number=iterations) / iterations,
+        )
+
+
+async def time_async(operation, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await operation()
+    return (time.perf_counter() - started) / iterations
+
+
+async def bench_token_manager(iterations: int, redis_url: str | None):
+    import redis.asyncio as redis
+
+    from app.services import tokens
+
+    manager = tokens.TokenManager()
+    if redis_url:
+        manager.cache = redis.from_url(redis_url, decode_responses=True)
+    elif fakeredis is not None:
+        manager.cache = fakeredis.FakeAsyncRedis(decode_responses=True)
+    else:
+        raise SystemExit("fakeredis is not installed, pass --redis-url to use a running Redis.")
+
+    session_id = secrets.token_urlsafe(32)
+    access_token = make_access_token("auth0|0123456789abcdef01234567")
+    await manager._store_tokens(session_id, access_token, secrets.token_urlsafe(32))
+    session = await manager.load_session(session_id, use_local_cache=False)
+
+    def fresh_record() -> tokens.SessionRecord:
+        return tokens.SessionRecord(session)
+
+    print("TokenManager")
+    report(
+        "store tokens (encrypt + MULTI)",
+        await time_async(lambda: manager._store_tokens(session_id, access_token), iterations),
+    )
+    report(
+        "load session from redis",
+        await time_async(lambda: manager.load_session(session_id, use_local_cache=False), iterations),
+    )
+    manager.local_cache = tokens.LocalCache(1000, 60)
+    await manager.load_session(session_id)
+    report("load session from local cache", await time_async(lambda: manager.load_session(session_id), iterations))
+    report(
+        "claims, new record",
+        timeit.timeit(lambda: manager.get_claims(fresh_record()), number=iterations) / iterations,
+    )
+    report(
+        "claims, memoised on record", timeit.timeit(lambda: manager.get_claims(session), number=iterations) / iterations
+    )
+    report(
+        "access token, new record",
+        timeit.timeit(lambda: manager.get_access_token(fresh_record()), number=iterations) / iterations,
+    )
+    report(
+        "read_claims (JWT payload decode)",
+        timeit.timeit(lambda: tokens.read_claims(access_token), number=iterations) / iterations,
+    )
+    await manager.cache.delete(f"session:{session_id}")
+    await manager.cache.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--redis-url", help="use this Redis instead of an in-process fake")
+    args = parser.parse_args()
+
+    configure_environment()
+    bench_encryption(args.iterations)
+    asyncio.run(bench_token_manager(args.iterations, args.redis_url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Session traffic against the BFF and the backend running on localhost.
+
+Starts the backend and the BFF as uvicorn processes, a stub Auth0 (discovery, JWKS, `/oauth/token`,
+`/passwordless/start`) and, unless `--redis-url` is given, an in-memory Redis. Logs in `--users` sessions
+through the OTP flow and has each of them request `/catalog/`, `/users/me` and `/auth/status` for `--duration`
+seconds, first with long-lived tokens and then, with a real Redis, with tokens that expire during the run.
+
+Reports p50/p99 latency per route, throughput, Redis round trips and commands per request (read from the
+BFF's /metrics: the services run with the `metrics` extra, or with `--python`, an interpreter that has
+prometheus-client) and CPU per request of each service.
+
+    uv run python -m benchmarks.load --users 50 --duration 20
+    uv run python -m benchmarks.load --redis-url redis://127.0.0.1:6379/15 --bff-env SESSION_CACHE_ENABLED=true
+    uv run python -m benchmarks.load --bff-env SESSION_STORAGE=cookie
+
+The load generator and the stub Auth0 share this process, so compare runs on the same machine rather than
+reading the throughput as a capacity figure.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import secrets
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import httpx
+from authlib.jose import JsonWebKey, jwt
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks._support import (
+    DEFAULT_ENV,
+    cpu_seconds,
+    free_port,
+    percentile,
+    serve_in_thread,
+    start_fake_redis,
+)
+
+BFF_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = BFF_DIR.parent / "backend"
+PERMISSIONS = ["read:products", "read:user"]
+# Share of requests per route, roughly what the frontend sends once a user is logged in
+TRAFFIC = {"/catalog/": 5, "/users/me": 3, "/auth/status": 2}
+METRIC_PATTERN = re.compile(r"^(bff_redis_round_trips_total|bff_redis_commands_total) (\S+)$", re.MULTILINE)
+
+
+class StubAuth0:
+    """Issues RS256 access tokens for OTP logins and refresh grants, with rotating refresh tokens, and serves the
+    matching JWKS."""
+
+    def __init__(self, domain: str, audience: str):
+        self.issuer = f"https://{domain}/"
+        self.audience = audience
+        self.key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": "benchmark"})
+        self.token_lifetime = 3600
+        self.refresh_tokens: dict[str, str] = {}
+        self.grants: Counter[str] = Counter()
+
+    def issue(self, sub: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "sub": sub,
+            "aud": [self.audience, f"{self.issuer}userinfo"],
+            "iat": now,
+            "exp": now + self.token_lifetime,
+            "scope": "openid profile email offline_access",
+            "permissions": PERMISSIONS,
+        }
+        return jwt.encode({"alg": "RS256", "kid": "benchmark"}, claims, self.key).decode()
+
+    async def jwks(self, request):
+        return JSONResponse({"keys": [self.key.as_dict()]}, headers={"Cache-Control": "max-age=600"})
+
+    async def discovery(self, request):
+        base_url = str(request.base_url).rstrip("/")
+        return JSONResponse(
+            {
+                "issuer": self.issuer,
+                "authorization_endpoint": f"{base_url}/authorize",
+                "token_endpoint": f"{base_url}/oauth/token",
+                "jwks_uri": f"{base_url}/.well-known/jwks.json",
+            }
+        )
+
+    async def passwordless_start(self, request):
+        return JSONResponse({"_id": secrets.token_hex(8), "email": (await request.json())["email"]})
+
+    async def token(self, request):
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = await request.json()
+        else:
+            params = dict(parse_qsl((await request.body()).decode()))
+
+        if params.get("grant_type") == "refresh_token":
+            # Rotating refresh tokens: the one used is revoked and a new one is returned
+            sub = self.refresh_tokens.pop(params.get("refresh_token"), None)
+            if sub is None:
+                return JSONResponse({"error": "invalid_grant"}, status_code=403)
+            self.grants["refresh"] += 1
+            refresh_token = secrets.token_urlsafe(32)
+            self.refresh_tokens[refresh_token] = sub
+            return JSONResponse(
+                {"access_token": self.issue(sub), "refresh_token": refresh_token, "expires_in": self.token_lifetime}
+            )
+
+        sub = f"email|{params['username']}"
+        refresh_token = secrets.token_urlsafe(32)
+        self.refresh_tokens[refresh_token] = sub
+        self.grants["otp"] += 1
+        return JSONResponse(
+            {"access_token": self.issue(sub), "id_token": None, "refresh_token": refresh_token, "expires_in": 3600}
+        )
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/.well-known/openid-configuration", self.discovery),
+                Route("/.well-known/jwks.json", self.jwks),
+                Route("/passwordless/start", self.passwordless_start, methods=["POST"]),
+                Route("/oauth/token", self.token, methods=["POST"]),
+            ]
+        )
+
+
+def start_service(directory: Path, port: int, env: dict[str, str], args) -> subprocess.Popen:
+    """Run a service with the given interpreter, or in its own project environment through uv."""
+    command = ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    if args.python:
+        command = [args.python, *command]
+    elif shutil.which("uv"):
+        # The Redis counters are read from the BFF's /metrics
+        command = ["uv", "run", "--quiet", "--extra", "metrics", "python", *command]
+    else:
+        command = [sys.executable, *command]
+    output = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=directory, env={**os.environ, **env}, stdout=output, stderr=output)
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"{url} exited with status {process.returncode}")
+            try:
+                await client.get(f"{url}/openapi.json")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise SystemExit(f"{url} did not start within {timeout:.0f} s")
+
+
+async def read_redis_counters(client: httpx.AsyncClient) -> dict[str, float] | None:
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return None
+    return {name: float(value) for name, value in METRIC_PATTERN.findall(response.text)}
+
+
+async def log_in(client: httpx.AsyncClient, users: int, run_id: str) -> list[dict[str, str]]:
+    """Create a session per user through the OTP flow and return their session cookies."""
+    sessions = []
+    for i in range(users):
+        email = f"user{i}-{run_id}@benchmark.invalid"
+        await client.post("/auth/login/otp/send", json={"email": email})
+        response = await client.post("/auth/login/otp/verify", json={"email": email, "otp": "000000"})
+        response.raise_for_status()
+        # The cookies are marked Secure, so they are not sent back over plain HTTP by the client's cookie jar
+        sessions.append(dict(response.cookies))
+    return sessions
+
+
+async def drive(client: httpx.AsyncClient, sessions: list[dict[str, str]], duration: float):
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    routes = list(TRAFFIC)
+    weights = list(TRAFFIC.values())
+    deadline = time.monotonic() + duration
+
+    async def user(cookies: dict[str, str]):
+        etags: dict[str, str] = {}
+        while time.monotonic() < deadline:
+            route = random.choices(routes, weights)[0]
+            request_headers = {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+            if route in etags:
+                request_headers["If-None-Match"] = etags[route]
+            started = time.perf_counter()
+            try:
+                response = await client.get(route, headers=request_headers)
+                status = response.status_code
+                if "etag" in response.headers:
+                    etags[route] = response.headers["etag"]
+                # With cookie storage a refresh re-seals the session cookie
+                cookies.update(response.cookies)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[route].append(time.perf_counter() - started)
+            statuses[route][status] += 1
+
+    await asyncio.gather(*(user(dict(cookies)) for cookies in sessions))
+    return latencies, statuses
+
+
+async def run_scenario(name: str, args, client, auth0: StubAuth0, services: dict[str, subprocess.Popen]):
+    auth0.token_lifetime = args.token_lifetime if name == "token expiry" else 3600
+    sessions = await log_in(client, args.users, secrets.token_hex(4))
+    grants = auth0.grants.copy()
+    redis_before = await read_redis_counters(client)
+    cpu_before = {service: cpu_seconds(process.pid) for service, process in services.items()}
+    started = time.perf_counter()
+    latencies, statuses = await drive(client, sessions, args.duration)
+    elapsed = time.perf_counter() - started
+    cpu_after = {service: cpu_seconds(process.pid) for service, process in services.items()}
+    redis_after = await read_redis_counters(client)
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{name}: {args.users} sessions, {elapsed:.1f} s, {total} requests, {total / elapsed:.0f} req/s")
+    for route in TRAFFIC:
+        values = latencies[route]
+        print(
+            f"  {route:<14} n={len(values):<7} p50 {percentile(values, 50) * 1000:7.2f} ms"
+            f"  p99 {percentile(values, 99) * 1000:7.2f} ms  statuses {dict(statuses[route])}"
+        )
+    if redis_before is not None and redis_after is not None and total:
+        round_trips = redis_after["bff_redis_round_trips_total"] - redis_before["bff_redis_round_trips_total"]
+        commands = redis_after["bff_redis_commands_total"] - redis_before["bff_redis_commands_total"]
+        print(f"  redis per request: {round_trips / total:.2f} round trips, {commands / total:.2f} commands")
+    else:
+        print("  redis per request: n/a (the BFF needs prometheus-client and METRICS_ENABLED=true)")
+    for service in services:
+        if cpu_before[service] is None or not total:
+            print(f"  {service} cpu per request: n/a")
+            continue
+        print(f"  {service} cpu per request: {(cpu_after[service] - cpu_before[service]) / total * 1000:.3f} ms")
+    print(f"  auth0 refresh grants: {auth0.grants['refresh'] - grants['refresh']}")
+
+
+async def run(args):
+    redis_url = args.redis_url or start_fake_redis()
+    auth0 = StubAuth0(DEFAULT_ENV["AUTH0_DOMAIN"], DEFAULT_ENV["AUTH0_AUDIENCE"])
+    auth0_port, backend_port, bff_port = free_port(), free_port(), free_port()
+    serve_in_thread(auth0.app(), auth0_port)
+    auth0_url = f"http://127.0.0.1:{auth0_port}"
+
+    backend_env = {
+        "AUTH0_DOMAIN": DEFAULT_ENV["AUTH0_DOMAIN"],
+        "AUTH0_AUDIENCE": DEFAULT_ENV["AUTH0_AUDIENCE"],
+        "AUTH0_JWKS_URL": f"{auth0_url}/.well-known/jwks.json",
+    }
+    bff_env = {
+        **DEFAULT_ENV,
+        "AUTH0_BASE_URL": auth0_url,
+        "REDIS_URL": redis_url,
+        "BACKEND_URL": f"http://127.0.0.1:{backend_port}",
+        "METRICS_ENABLED": "true",
+        # Leave room for requests between the early refresh and expiry of the short-lived tokens
+        "REFRESH_AHEAD_WINDOW": str(args.token_lifetime / 4),
+    }
+    bff_env.update(setting.split("=", 1) for setting in args.bff_env)
+
+    services = {
+        "backend": start_service(BACKEND_DIR, backend_port, backend_env, args),
+        "bff": start_service(BFF_DIR, bff_port, bff_env, args),
+    }
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{backend_port}", services["backend"])
+        await wait_until_ready(f"http://127.0.0.1:{bff_port}", services["bff"])
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{bff_port}", limits=limits, timeout=30) as client:
+            await run_scenario("steady", args, client, auth0, services)
+            if args.redis_url:
+                await run_scenario("token expiry", args, client, auth0, services)
+            else:
+                print("\ntoken expiry: skipped, the refresh lock needs a real Redis (--redis-url)")
+    finally:
+        for process in services.values():
+            process.terminate()
+        for process in services.values():
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--token-lifetime", type=int, default=4, help="seconds, for the token expiry scenario")
+    parser.add_argument("--redis-url", help="use this Redis instead of an in-memory one (it is not flushed)")
+    parser.add_argument("--python", help="interpreter for both services, instead of `uv run` in each project")
+    parser.add_argument("--bff-env", action="append", default=[], metavar="KEY=VALUE", help="extra BFF settings")
+    parser.add_argument("--verbose", action="store_true", help="show the services' logs")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Event-loop latency while many token refreshes are in flight.
+
+Runs a fake `/oauth/token` endpoint with a fixed delay (and a discovery document, loaded by the warm-up
+refresh so it is not part of the measurement) and measures how late a 5 ms ticker wakes up
+while N refreshes run concurrently. `--blocking` reproduces the old synchronous client for comparison.
+
+    uv run python -m benchmarks.refresh_event_loop --concurrency 50 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks._support import configure_environment, free_port, percentile, serve_in_thread
+
+TICK = 0.005
+
+
+def create_token_endpoint(latency: float) -> Starlette:
+    async def token(request):
+        await asyncio.sleep(latency)
+        return JSONResponse({"access_token": "benchmark-access-token", "token_type": "Bearer", "expires_in": 60})
+
+    async def discovery(request):
+        base_url = str(request.base_url).rstrip("/")
+        return JSONResponse({"issuer": f"{base_url}/", "token_endpoint": f"{base_url}/oauth/token"})
+
+    return Starlette(
+        routes=[
+            Route("/.well-known/openid-configuration", discovery),
+            Route("/oauth/token", token, methods=["POST"]),
+        ]
+    )
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def blocking_refresh(base_url: str, refresh_token: str) -> str | None:
+    """The pre-async implementation: a synchronous client inside a coroutine."""
+    with httpx.Client(base_url=base_url) as client:
+        response = client.post("/oauth/token", data={"grant_type": "refresh_token", "refresh_token": refresh_token})
+        return response.json().get("access_token")
+
+
+async def run(concurrency: int, blocking: bool, base_url: str) -> dict:
+    from app.services.authentication import get_auth_service
+
+    auth_service = get_auth_service()
+
+    async def refresh(token: str) -> str | None:
+        if blocking:
+            return await blocking_refresh(base_url, token)
+        tokens = await auth_service.refresh(token)
+        return tokens.access_token if tokens else None
+
+    await refresh("warmup")
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(refresh(f"refresh-token-{i}") for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    await auth_service.aclose()
+    return {
+        "mode": "blocking" if blocking else "async",
+        "refreshes": sum(1 for result in results if result),
+        "wall_ms": elapsed * 1000,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake token endpoint delay in seconds")
+    parser.add_argument("--blocking", action="store_true", help="use the old synchronous client")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    configure_environment(AUTH0_BASE_URL=base_url)
+    server = serve_in_thread(create_token_endpoint(args.latency), port)
+    try:
+        result = asyncio.run(run(args.concurrency, args.blocking, base_url))
+    finally:
+        server.should_exit = True
+
+    for key, value in result.items():
+        print(f"{key:>12}: {value:.2f}" if isinstance(value, float) else f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
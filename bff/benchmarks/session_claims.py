@@ -0,0 +1,95 @@
+"""Cost of reading the user id and permissions from a stored session.
+
+Compares the previous layout (encrypted `user_id` plus a PyJWT decode of the access token for anything
+else) with the compact claims now stored next to the session, and counts how often the JWT is parsed
+while serving requests.
+
+    uv run python -m benchmarks.session_claims --requests 20000
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+import jwt
+
+from benchmarks._support import configure_environment
+
+
+def make_access_token() -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://auth0.invalid/",
+        "sub": "auth0|0123456789abcdef01234567",
+        "aud": ["https://api.invalid", "https://auth0.invalid/userinfo"],
+        "iat": now,
+        "exp": now + 3600,
+        "scope": "openid profile email offline_access",
+        "azp": "benchmark-client",
+        "permissions": ["read:products", "read:user", "write:orders", "read:orders"],
+    }
+    return jwt.encode(claims, "benchmark-signing-key-of-32-bytes!", algorithm="HS256")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    configure_environment()
+    from app.services import tokens
+    from app.services.encryption import get_encryption_service
+
+    crypto = get_encryption_service()
+    manager = tokens.TokenManager()
+    access_token = make_access_token()
+
+    legacy_record = {"user_id": crypto.encrypt(jwt.decode(access_token, options={"verify_signature": False})["sub"])}
+    legacy_record["access_token"] = crypto.encrypt(access_token)
+    claims = manager._compact_claims(tokens.read_claims(access_token))
+    compact_record = {
+        "claims": crypto.encrypt(json.dumps(claims, separators=(",", ":"))),
+        "access_token": crypto.encrypt(access_token),
+    }
+
+    def legacy_request():
+        crypto.decrypt(legacy_record["user_id"])
+        token = crypto.decrypt(legacy_record["access_token"])
+        jwt.decode(token, options={"verify_signature": False}).get("permissions")
+
+    def compact_request():
+        session = tokens.SessionRecord(compact_record)
+        manager.get_claims(session).get("permissions")
+
+    cached_session = tokens.SessionRecord(compact_record)
+
+    def cached_request():
+        manager.get_claims(cached_session).get("permissions")
+
+    parses = 0
+    original_read_claims = tokens.read_claims
+
+    def counting_read_claims(token: str) -> dict:
+        nonlocal parses
+        parses += 1
+        return original_read_claims(token)
+
+    tokens.read_claims = counting_read_claims
+    results = {}
+    for name, request in (
+        ("pyjwt decode per request", legacy_request),
+        ("stored claims, record from redis", compact_request),
+        ("stored claims, record from local cache", cached_request),
+    ):
+        results[name] = timeit.timeit(request, number=args.requests) / args.requests
+    tokens.read_claims = original_read_claims
+
+    print(f"{args.requests} simulated requests, user id + permissions per request")
+    for name, seconds in results.items():
+        print(f"  {name:<42} {seconds * 1e6:8.2f} us/request")
+    print(f"  JWT parses while serving requests: {parses}")
+
+
+if __name__ == "__main__":
+    main()
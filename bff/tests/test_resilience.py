@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.resilience import CircuitBreaker, ResilientTransport, Upstream, UpstreamUnavailable
+from app.models.resilience import ResiliencePolicy
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Answers 200 after reading the request body, or fails with a connection error or hangs until cancelled,
+    depending on `mode`."""
+
+    def __init__(self):
+        self.mode = "ok"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "fail":
+            raise httpx.ConnectError("connection refused", request=request)
+        if self.mode == "hang":
+            await asyncio.sleep(3600)
+        await request.aread()
+        return httpx.Response(200, request=request)
+
+
+def make_client(recovery_timeout: float = 0.01) -> tuple[httpx.AsyncClient, FlakyTransport, Upstream]:
+    policy = ResiliencePolicy(failure_threshold=1, recovery_timeout=recovery_timeout, retries=0)
+    upstream = Upstream("test", policy)
+    inner = FlakyTransport()
+    return httpx.AsyncClient(transport=ResilientTransport(upstream, inner)), inner, upstream
+
+
+async def open_circuit(client: httpx.AsyncClient, inner: FlakyTransport, upstream: Upstream):
+    inner.mode = "fail"
+    with pytest.raises(httpx.ConnectError):
+        await client.get("http://upstream.invalid/")
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+
+
+def test_cancelled_probe_does_not_leave_circuit_half_open():
+    async def scenario():
+        client, inner, upstream = make_client()
+        await open_circuit(client, inner, upstream)
+        await asyncio.sleep(0.02)
+
+        inner.mode = "hang"
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(client.get("http://upstream.invalid/"), 0.01)
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+        # The upstream has recovered: the next probe goes through and closes the circuit
+        inner.mode = "ok"
+        await asyncio.sleep(0.02)
+        response = await client.get("http://upstream.invalid/")
+        assert response.status_code == 200
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_probe_failing_on_request_body_reopens_circuit():
+    async def body():
+        raise ValueError("request body too large")
+        yield b""
+
+    async def scenario():
+        client, inner, upstream = make_client()
+        await open_circuit(client, inner, upstream)
+        await asyncio.sleep(0.02)
+
+        inner.mode = "ok"
+        with pytest.raises(ValueError):
+            await client.post("http://upstream.invalid/", content=body())
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_request_does_not_count_while_closed():
+    async def scenario():
+        client, inner, upstream = make_client(recovery_timeout=60)
+        inner.mode = "hang"
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(client.get("http://upstream.invalid/"), 0.01)
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+        inner.mode = "ok"
+        assert (await client.get("http://upstream.invalid/")).status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_open_circuit_fails_fast():
+    async def scenario():
+        client, inner, upstream = make_client(recovery_timeout=60)
+        await open_circuit(client, inner, upstream)
+        with pytest.raises(UpstreamUnavailable):
+            await client.get("http://upstream.invalid/")
+
+    asyncio.run(scenario())